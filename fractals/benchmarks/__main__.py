@@ -0,0 +1,55 @@
+import argparse
+import json
+import sys
+
+from fractals.benchmarks.suite import GROUPS, run_benchmarks, compare_results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m fractals.benchmarks',
+                                     description='Benchmarks the fractal constructions and writes the results as JSON.')
+    parser.add_argument('groups', nargs='*', default=list(GROUPS),
+                        help=f'The groups of benchmark cases to run (default: all of {", ".join(GROUPS)}).')
+    parser.add_argument('-o', '--output', help='The file to write the results to (default: the standard output).')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='The number of timed runs of every case, of which the fastest is reported (default: 3).')
+    parser.add_argument('--quick', action='store_true', help='Only run smaller cases, to check that everything works.')
+    parser.add_argument('--completeness', type=float, default=0.99,
+                        help='The completeness cutoff of the render cases (default: 0.99).')
+    parser.add_argument('--baseline',
+                        help='Results of an earlier run to compare against. The comparison is printed to the standard '
+                             'error, and the exit status is 1 if any case regressed.')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='The proportion by which a case has to be slower or use more memory than in the baseline '
+                             'to count as a regression (default: 0.1).')
+    arguments = parser.parse_args()
+    if unknown := set(arguments.groups) - set(GROUPS):
+        parser.error(f'unknown benchmark groups: {", ".join(sorted(unknown))}')
+
+    # The line constructions and the Pythagoras tree import pyplot, which must never open a window here.
+    import matplotlib
+    matplotlib.use('Agg')
+
+    results = run_benchmarks(arguments.groups, arguments.repeat, arguments.quick, arguments.completeness,
+                             print_progress=True)
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+        comparisons = compare_results(baseline, results, arguments.threshold)
+        for comparison in comparisons:
+            print(f'{"REGRESSED " if comparison["regressed"] else ""}{comparison["group"]} {comparison["name"]} '
+                  f'{comparison["parameters"]}: time x{comparison["time_ratio"]:.3f}, '
+                  f'memory x{comparison["memory_ratio"]:.3f}', file=sys.stderr)
+        if any(comparison['regressed'] for comparison in comparisons):
+            sys.exit(1)
+
+
+if __name__ == '__main__':  # Don't worry about what this does
+    main()
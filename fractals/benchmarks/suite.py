@@ -0,0 +1,331 @@
+"""
+Benchmarks of the fractal constructions, for comparing their throughput between commits.
+
+Every benchmark case prepares its input, then runs the measured work several times and keeps the fastest time, which is
+the least disturbed by other processes. The peak memory of a case is measured in one further run with tracemalloc,
+which slows down allocations, so it is never measured in the timed runs. All cases use fixed random states, so every run
+of a case does the same work.
+"""
+
+
+from collections.abc import Callable, Iterable, Sequence
+import copy
+import gc
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+__all__ = ['GROUPS', 'run_benchmarks', 'compare_results']
+
+
+# The groups of benchmark cases, in the order they are run.
+GROUPS = ('chaos', 'precision', 'render', 'lines', 'pythagoras')
+
+_SEED = 0
+_CHAOS_CURVES = ('koch_curve', 'levy_c_curve', 'barnsley_fern')
+_RENDER_CURVES = ('koch_curve', 'levy_c_curve', 'vepstas_gallery23')
+
+
+def _fresh_ifs(name: str, precision: str = 'float64'):
+    """Returns a copy of a cookbook curve with a fixed random state and no generated points."""
+    from fractals.ifs import cookbook
+
+    ifs = copy.copy(getattr(cookbook, name))
+    ifs.clear()
+    ifs.set_random_state(_SEED)
+    ifs.precision = precision
+    return ifs
+
+
+def _measure(group: str,
+             name: str,
+             parameters: dict[str, Any],
+             unit: str,
+             prepare: Callable[[], Callable[[], int | tuple[int, dict[str, Any]]]],
+             repeat: int) -> dict[str, Any]:
+    """
+    Measures one benchmark case.
+    :param group: The group of the case.
+    :param name: The name of the case within its group.
+    :param parameters: The parameters of the case, which identify it together with its group and name.
+    :param unit: The unit of the work done by the case, such as 'points' or 'segments'.
+    :param prepare: A function preparing a run of the case, which is not measured. It returns the function doing the
+                    measured work, which returns the amount of work done, optionally together with details of the run
+                    which are added to the result of the fastest run.
+    :param repeat: The number of timed runs.
+    :return: The result of the case.
+    """
+    times = []
+    details = {}
+    for _ in range(repeat):
+        run = prepare()
+        gc.collect()
+        start = time.perf_counter()
+        work = run()
+        times.append(time.perf_counter() - start)
+        if isinstance(work, tuple):
+            work, run_details = work
+            if times[-1] == min(times):
+                details = run_details
+
+    run = prepare()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(times)
+    return {'group': group, 'name': name, 'parameters': parameters, 'unit': unit, 'work': work, 'seconds': seconds,
+            'median_seconds': statistics.median(times), 'rate': work / seconds if seconds > 0 else None,
+            'peak_memory': peak_memory, **details}
+
+
+def _chaos_cases(quick: bool, repeat: int) -> Iterable[dict[str, Any]]:
+    """Points per second of the chaos game itself, without rendering or retaining the points."""
+    npoints = 10 ** 5 if quick else 10 ** 6
+    for name in _CHAOS_CURVES:
+        def prepare(name=name):
+            ifs = _fresh_ifs(name)
+            return lambda: len(next(ifs.generate_points(npoints, retain=False)))
+        yield _measure('chaos', name, {'npoints': npoints}, 'points', prepare, repeat)
+
+
+def _precision_accuracy(name: str, npoints: int, length: int, width: int) -> dict[str, Any]:
+    """
+    Compares the chaos game of a curve in single precision against double precision. Both draw the same map choices,
+    so they generate the same points up to rounding.
+    :return: The largest distance between the same points as a proportion of the diagonal of the bounds of the curve,
+             and the proportion of the filled pixels of an image which differ.
+    """
+    (x_min, x_max), (y_min, y_max) = _fresh_ifs(name).bounds()
+    points = [next(_fresh_ifs(name, precision).generate_points(npoints, retain=False))
+              for precision in ('float64', 'float32')]
+    deviation = np.abs(points[0] - points[1]).max()
+    images = [np.asarray(_fresh_ifs(name, precision).make_image(length, width, batch_size=10000))
+              for precision in ('float64', 'float32')]
+    filled = np.count_nonzero(images[0] | images[1])
+    return {'max_deviation': float(deviation / np.hypot(x_max - x_min, y_max - y_min)),
+            'pixel_mismatch': np.count_nonzero(images[0] != images[1]) / max(filled, 1)}
+
+
+def _precision_cases(quick: bool, repeat: int) -> Iterable[dict[str, Any]]:
+    """
+    Points per second and peak memory of generating and retaining points of the chaos game in double and in single
+    precision, with the accuracy of single precision against double precision (see _precision_accuracy).
+    """
+    npoints = 10 ** 5 if quick else 10 ** 6
+    length, width = (640, 480) if quick else (1920, 1080)
+    for name in _CHAOS_CURVES:
+        for precision in ('float64', 'float32'):
+            def prepare(name=name, precision=precision):
+                ifs = _fresh_ifs(name, precision)
+
+                def run():
+                    ifs.calculate_points(npoints)
+                    return len(ifs.points)
+                return run
+            result = _measure('precision', name, {'npoints': npoints, 'precision': precision}, 'points', prepare,
+                              repeat)
+            if precision == 'float32':
+                result.update(_precision_accuracy(name, npoints, length, width))
+            yield result
+
+
+def _render_cases(quick: bool, repeat: int, completeness_cutoff: float) -> Iterable[dict[str, Any]]:
+    """
+    Time and peak memory of rendering a curve with make_image until it reaches the completeness cutoff, with the number
+    of points it took and the time spent in each phase of the render.
+    """
+    from fractals.ifs.metrics import RenderMetrics
+
+    resolutions = ((640, 480), (1280, 720)) if quick else ((640, 480), (1920, 1080), (3840, 2160))
+    for name in _RENDER_CURVES:
+        for length, width in resolutions:
+            def prepare(name=name, length=length, width=width):
+                ifs = _fresh_ifs(name)
+
+                def run():
+                    metrics = RenderMetrics()
+                    ifs.make_image(length, width, batch_size=10000, completeness_cutoff=completeness_cutoff,
+                                   metrics=metrics)
+                    return length * width, {'npoints': metrics.npoints, 'phases': metrics.phases}
+                return run
+            yield _measure('render', name, {'length': length, 'width': width,
+                                            'completeness_cutoff': completeness_cutoff}, 'pixels', prepare, repeat)
+
+
+def _line_cases(quick: bool, repeat: int) -> Iterable[dict[str, Any]]:
+    """Segments per second of the line constructions at increasing depth."""
+    from fractals.line_construction.koch import koch
+    from fractals.line_construction.levy_c import levyc
+    from fractals.line_construction.dragon_curve import iter_dragon, unfold_dragon, dragon_chunks
+
+    start_point, end_point = np.array([-1.0, 0.0]), np.array([1.0, 0.0])
+
+    def iterated_dragon(depth: int) -> int:
+        points = [np.array([0, 0]), np.array([1, 0])]
+        for _ in range(depth):
+            points = iter_dragon(points)
+        return len(points)
+
+    # Every construction returns the number of vertices it built.
+    constructions = {
+        'koch': (lambda depth: len(koch(start_point, end_point, depth)), range(3, 6) if quick else range(3, 8)),
+        'levyc': (lambda depth: len(levyc(start_point, end_point, depth)),
+                  range(6, 11, 2) if quick else range(6, 15, 2)),
+        'iter_dragon': (iterated_dragon, range(8, 13, 2) if quick else range(8, 19, 2)),
+        'unfold_dragon': (lambda depth: len(unfold_dragon(start_point, end_point, depth)),
+                          range(8, 17, 4) if quick else range(8, 25, 4)),
+        'dragon_chunks': (lambda depth: sum(len(chunk) for chunk in dragon_chunks(start_point, end_point, depth)),
+                          range(8, 17, 4) if quick else range(8, 25, 4)),
+    }
+    for name, (construct, depths) in constructions.items():
+        for depth in depths:
+            def prepare(construct=construct, depth=depth):
+                return lambda: construct(depth) - 1
+            yield _measure('lines', name, {'depth': depth}, 'segments', prepare, repeat)
+
+
+def _pythagoras_cases(quick: bool, repeat: int) -> Iterable[dict[str, Any]]:
+    """
+    Squares per second of building the Pythagoras tree down to decreasing leg lengths, as polygons and as the arrays of
+    its levels, and of rasterizing those levels into an image.
+    """
+    from fractals.pythagoras_tree.__main__ import pythagoras_tree
+    from fractals.pythagoras_tree.render import rasterize_tree
+    from fractals.pythagoras_tree.tree import tree_levels
+
+    for min_leg in (0.1, 0.05) if quick else (0.1, 0.05, 0.02, 0.01):
+        def prepare(min_leg=min_leg):
+            return lambda: len(pythagoras_tree(30, min_leg))
+        yield _measure('pythagoras', 'pythagoras_tree', {'alpha': 30, 'min_leg': min_leg}, 'squares', prepare, repeat)
+    for min_leg in (0.01, 0.001) if quick else (0.01, 0.001, 0.0003):
+        def prepare(min_leg=min_leg):
+            return lambda: sum(len(level) for level in tree_levels(30, min_leg))
+        yield _measure('pythagoras', 'tree_levels', {'alpha': 30, 'min_leg': min_leg}, 'squares', prepare, repeat)
+    for min_leg in (0.01, 0.001) if quick else (0.01, 0.001, 0.0003):
+        def prepare(min_leg=min_leg):
+            levels = list(tree_levels(30, min_leg))
+
+            def run():
+                rasterize_tree(levels)
+                return sum(len(level) for level in levels)
+            return run
+        yield _measure('pythagoras', 'rasterize_tree', {'alpha': 30, 'min_leg': min_leg, 'length': 1600, 'width': 1200},
+                       'squares', prepare, repeat)
+
+
+def _commit() -> str | None:
+    """Returns the commit of the working tree, marked if the tree has uncommitted changes, or None outside of git."""
+    directory = Path(__file__).parent
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=directory, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        changes = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=directory,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{commit}-dirty' if changes else commit
+
+
+def run_benchmarks(groups: Sequence[str] = GROUPS,
+                   repeat: int = 3,
+                   quick: bool = False,
+                   completeness_cutoff: float = 0.99,
+                   print_progress: bool = False) -> dict[str, Any]:
+    """
+    Runs the benchmark cases of the given groups. Results are returned as a dictionary which can be saved as JSON:
+
+    - 'chaos': points per second of the chaos game for a few curves, without rendering.
+    - 'precision': points per second and peak memory of generating and retaining points in double and in single
+      precision, with the largest deviation of single precision points and the proportion of differing pixels.
+    - 'render': time and peak memory of AffineIFS.make_image to reach the completeness cutoff at fixed resolutions,
+      with the number of points it took and the time of each phase (see fractals.ifs.metrics.RenderMetrics).
+    - 'lines': segments per second of koch, levyc and the dragon curve constructions at increasing depth.
+    - 'pythagoras': squares per second of building the Pythagoras tree down to decreasing leg lengths, as polygons and
+      as the arrays of its levels, and of rasterizing the levels into an image.
+
+    :param groups: The groups of cases to run (default: all groups).
+    :param repeat: The number of timed runs of every case, of which the fastest is reported (default: 3).
+    :param quick: If True, only smaller cases are run, to check quickly that the benchmarks work (default: False).
+    :param completeness_cutoff: The completeness cutoff of the render cases (default: 0.99).
+    :param print_progress: If True, print every finished case to the standard error (default: False).
+    :return: The metadata of the run, such as the commit and the versions of Python and NumPy, and the results of all
+             cases, each with its work, fastest and median time in seconds, rate of work per second and peak memory in
+             bytes.
+    """
+    if repeat < 1:
+        raise ValueError(f'At least one timed run is needed, got {repeat}')
+    cases = {
+        'chaos': lambda: _chaos_cases(quick, repeat),
+        'precision': lambda: _precision_cases(quick, repeat),
+        'render': lambda: _render_cases(quick, repeat, completeness_cutoff),
+        'lines': lambda: _line_cases(quick, repeat),
+        'pythagoras': lambda: _pythagoras_cases(quick, repeat),
+    }
+    for group in groups:
+        if group not in cases:
+            raise ValueError(f'Unknown benchmark group: {group!r}')
+
+    results = []
+    for group in GROUPS:
+        if group not in groups:
+            continue
+        for result in cases[group]():
+            results.append(result)
+            if print_progress:
+                print(f'{result["group"]} {result["name"]} {result["parameters"]}: {result["seconds"]:.4f} s, '
+                      f'{result["rate"] or 0:.4g} {result["unit"]}/s, {result["peak_memory"] / 2 ** 20:.1f} MiB',
+                      file=sys.stderr, flush=True)
+
+    metadata = {
+        'commit': _commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.machine(),
+        'repeat': repeat,
+        'quick': quick,
+    }
+    return {'metadata': metadata, 'results': results}
+
+
+def _key(result: dict[str, Any]) -> tuple:
+    return result['group'], result['name'], tuple(sorted(result['parameters'].items()))
+
+
+def compare_results(baseline: dict[str, Any],
+                    results: dict[str, Any],
+                    threshold: float = 0.1) -> list[dict[str, Any]]:
+    """
+    Compares benchmark results against a baseline, case by case. Cases which only appear in one of them are skipped.
+    :param baseline: Results returned by run_benchmarks, for example on an earlier commit.
+    :param results: The results to compare against the baseline.
+    :param threshold: The proportion by which a case has to be slower or use more memory than in the baseline to count
+                      as a regression (default: 0.1).
+    :return: For every case in both, its group, name and parameters, the ratios of its time and peak memory to those of
+             the baseline, and whether it regressed.
+    """
+    baseline_results = {_key(result): result for result in baseline['results']}
+    comparisons = []
+    for result in results['results']:
+        if (previous := baseline_results.get(_key(result))) is None:
+            continue
+        time_ratio = result['seconds'] / previous['seconds'] if previous['seconds'] > 0 else float('inf')
+        memory_ratio = result['peak_memory'] / previous['peak_memory'] if previous['peak_memory'] > 0 else 1.0
+        comparisons.append({'group': result['group'], 'name': result['name'], 'parameters': result['parameters'],
+                            'time_ratio': time_ratio, 'memory_ratio': memory_ratio,
+                            'regressed': time_ratio > 1 + threshold or memory_ratio > 1 + threshold})
+    return comparisons
@@ -0,0 +1,1141 @@
+"""Iterated function systems of any number of affine maps, drawn with the chaos game."""
+
+
+from collections.abc import Generator, Sequence
+import copy
+import os
+import time
+import numpy as np
+import numpy.typing as npt
+from typing import Literal, TYPE_CHECKING
+
+from fractals.ifs.dimension import BoxCounter, DimensionEstimate
+from fractals.ifs.metrics import RenderMetrics, _phase
+from fractals.ifs.progressive import RenderState
+from fractals.ifs.render import (Canvas, BinaryCanvas, SupersampledCanvas, TiledCanvas, DensityBuffer,
+                                 _ProgressPrinter)
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+__all__ = ['AffineIFS', 'barnsley_fern_ifs']
+
+
+def _fixed_point(matrix: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Returns the fixed point of an affine map given as a matrix, in homogeneous coordinates."""
+    linear, offset = matrix[1:, 1:], matrix[1:, 0]
+    return np.concatenate(([1], np.linalg.solve(np.identity(2) - linear, offset)))
+
+
+def _affine_matrix(linear: Sequence[Sequence[float]], offset: Sequence[float]) -> npt.NDArray[np.float64]:
+    """Returns the matrix of the affine map x -> linear @ x + offset in homogeneous coordinates."""
+    matrix = np.identity(3)
+    matrix[1:, 0] = offset
+    matrix[1:, 1:] = linear
+    return matrix
+
+
+# The largest depth, and the largest number, of the pieces whose endpoints give the first estimate of the bounds of an
+# attractor.
+_ENDPOINT_DEPTH = 8
+_ENDPOINT_PIECES = 1 << 8
+# The largest number of pieces, and the largest depth, the attractor is subdivided into when bounding it.
+_MAX_PIECES = 1 << 16
+_MAX_DEPTH = 256
+# How often the first estimate of the bounds is widened before the maps are considered not to contract.
+_WIDENINGS = 4
+# The largest number of pieces a single search subdivides when bounding an attractor. Attractors whose pieces shrink
+# slowly are bounded less tightly instead of taking longer.
+_SEARCH_PIECES = 1 << 14
+# The number of points of the chaos game which bound the attractor of maps which do not contract.
+_SAMPLE_POINTS = 1 << 18
+
+# A generous estimate of the memory needed to generate and render one point, in bytes.
+_BYTES_PER_POINT = 128
+
+# The smallest and largest default batch of a tiled render. Batches of a few thousand points are dominated by per-batch
+# overhead, while batches beyond a million points only delay the completeness check without rendering any faster.
+_TILED_BATCH_SIZES = 10 ** 4, 10 ** 6
+
+# The largest number of steps of the chaos game whose map choices are drawn at once.
+_CHOICE_STEPS = 64
+
+# The smallest probability of a map, as a proportion of the total weight, when the probabilities are weighted by the
+# determinants of the maps. Maps which collapse the plane onto a line, such as the stem of the Barnsley fern, still
+# need to be chosen now and then.
+_MIN_WEIGHT = 0.01
+
+# How many times smaller than a pixel the pieces of the attractor which straddle pixels are subdivided to when rendering
+# enumerated points. Smaller pieces fill in more of the pixels that the attractor only grazes, but more of them are
+# needed.
+_ADDRESS_SCALE = 4
+
+# How many times smaller than the viewport the pieces of the attractor are that points are mapped onto when rendering a
+# viewport. Smaller pieces waste fewer points outside the viewport, but more of them are needed.
+_PREFIX_SCALE = 4
+
+
+class _NotContractingError(ValueError):
+    """Raised when the pieces of an attractor do not shrink, so that no bounds contain every point of it."""
+
+
+def _subdivide(pieces: npt.NDArray[np.float64], maps: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Composes every piece with every map, in the order of the pieces and then the maps."""
+    if len(pieces) > _MAX_PIECES:
+        raise _NotContractingError('Too many pieces are needed to bound the attractor')
+    return (pieces[:, np.newaxis] @ maps).reshape(-1, 3, 3)
+
+
+def _contains_attractor(maps: npt.NDArray[np.float64],
+                        center: npt.NDArray[np.float64],
+                        half: npt.NDArray[np.float64]) -> bool:
+    """
+    Checks whether the attractor of the maps lies in the box with the given center (in homogeneous coordinates) and half
+    side lengths. Pieces are subdivided until the image of the box under each piece lies inside the box; the attractor
+    is then contained in the box, since it is the union of its pieces. If this takes more than _SEARCH_PIECES pieces,
+    the box is not shown to contain the attractor.
+    """
+    lower, upper = center[1:] - half, center[1:] + half
+    pieces = maps
+    budget = _SEARCH_PIECES
+    for _ in range(_MAX_DEPTH):
+        if not len(pieces):
+            return True
+        # The image of the box under a piece is bounded by a box around the image of its center.
+        centers = (pieces @ center)[:, 1:]
+        halves = np.abs(pieces[:, 1:, 1:]) @ half
+        inside = np.all((centers - halves >= lower) & (centers + halves <= upper), axis=1)
+        pieces = pieces[~inside]
+        budget -= len(pieces) * len(maps)
+        if budget < 0:
+            break
+        pieces = _subdivide(pieces, maps)
+    return False
+
+
+def _extent(maps: npt.NDArray[np.float64],
+            ends: npt.NDArray[np.float64],
+            center: npt.NDArray[np.float64],
+            half: npt.NDArray[np.float64],
+            direction: npt.NDArray[np.float64],
+            slack: float) -> float:
+    """
+    Returns an upper bound of the projection of the attractor onto the given direction which exceeds the largest
+    projection by at most the slack. The attractor must lie in the box with the given center and half side lengths.
+
+    Pieces are subdivided by branch and bound: the images of the fixed points of the maps under a piece lie on the
+    attractor, and the image of the box bounds the rest of the piece, so pieces whose box does not reach past the
+    furthest of these points by more than the slack are dropped. Once more than _SEARCH_PIECES pieces would be
+    subdivided, the furthest reach of the remaining pieces is returned instead, which still bounds the attractor but may
+    exceed it by more than the slack.
+    """
+    furthest = (direction @ ends[1:]).max()
+    bound = -np.inf
+    pieces = maps
+    budget = _SEARCH_PIECES
+    for _ in range(_MAX_DEPTH):
+        if not len(pieces):
+            return max(furthest, bound)
+        furthest = max(furthest, (direction @ (pieces @ ends)[:, 1:]).max())
+        reach = (pieces @ center)[:, 1:] @ direction + (np.abs(pieces[:, 1:, 1:]) @ half) @ np.abs(direction)
+        done = reach <= furthest + slack
+        bound = max(bound, reach[done].max(initial=-np.inf))
+        pieces = pieces[~done]
+        budget -= len(pieces) * len(maps)
+        if budget < 0:
+            return max(furthest, bound, reach.max())
+        pieces = _subdivide(pieces, maps)
+    raise _NotContractingError('The pieces of the attractor do not shrink')
+
+
+class _Prefixes:
+    """
+    The pieces of an attractor which are visible in a viewport, given by the compositions of maps (the prefixes of their
+    addresses) which map the whole attractor onto them. Points of the attractor are mapped onto a randomly chosen piece,
+    each chosen with the probability that the chaos game visits it, and only points inside the viewport are kept. Points
+    are then distributed over the viewport exactly as over the whole attractor, but hardly any are wasted outside it.
+    The depth is the largest number of maps composed into a piece.
+    """
+    def __init__(self,
+                 maps: npt.NDArray[np.float64],
+                 weights: npt.NDArray[np.float64],
+                 x_bounds: tuple[float, float],
+                 y_bounds: tuple[float, float],
+                 depth: int = 0) -> None:
+        self.maps = maps
+        self.depth = depth
+        self.thresholds = np.cumsum(weights / weights.sum())
+        self.thresholds[-1] = 1
+        self.lower = np.array([x_bounds[0], y_bounds[0]])
+        self.upper = np.array([x_bounds[1], y_bounds[1]])
+        # A viewport containing the whole attractor, such as the shared framing of an animation, needs no mapping.
+        self._identity = len(maps) == 1 and np.array_equal(maps[0], np.identity(3))
+
+    def __len__(self) -> int:
+        return len(self.maps)
+
+    def visible(self, points: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """Returns the given points, one (x, y) row per point, which lie inside the viewport."""
+        return points[np.all((points >= self.lower) & (points <= self.upper), axis=1)]
+
+    def apply(self, rng: np.random.Generator, points: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """
+        Maps the given points of the attractor, one (x, y) row per point, onto randomly chosen pieces.
+        :return: The mapped points inside the viewport.
+        """
+        if self._identity:
+            return self.visible(points)
+        maps = self.maps[np.searchsorted(self.thresholds, rng.random(len(points)), side='right')]
+        return self.visible(np.einsum('nij,nj->ni', maps[:, 1:, 1:], points) + maps[:, 1:, 0])
+
+
+class _PointStore:
+    """
+    A growable store of points made of chunked segments. Appending a segment never copies the points stored
+    before it; the segments are only joined into one array when all points are requested at once.
+    """
+    def __init__(self) -> None:
+        self._segments: list[npt.NDArray[np.float64]] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes held by the stored points."""
+        # Segments may be views of the coordinates in larger arrays of homogeneous points, which they keep alive.
+        return sum((segment if segment.base is None else segment.base).nbytes for segment in self._segments)
+
+    def append(self, points: npt.NDArray[np.float64]) -> None:
+        """Appends the given points as a new segment."""
+        self._segments.append(points)
+        self._size += len(points)
+
+    def array(self) -> npt.NDArray[np.float64]:
+        """Returns all stored points as one array, joining the segments if necessary."""
+        if len(self._segments) > 1:
+            self._segments = [np.concatenate(self._segments)]
+        return self._segments[0]
+
+    def bounds(self) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """Returns the column-wise minimum and maximum of the stored points without joining the segments."""
+        return (np.min([segment.min(axis=0) for segment in self._segments], axis=0),
+                np.max([segment.max(axis=0) for segment in self._segments], axis=0))
+
+    def batches(self, batch_size: int) -> Generator[npt.NDArray[np.float64], None, None]:
+        """
+        Yields the stored points in full batches of the given size; a trailing partial batch is not yielded. Batches
+        lying inside a single segment are views, only batches spanning several segments are copied.
+        """
+        pieces = []
+        missing = batch_size
+        for segment in list(self._segments):
+            offset = 0
+            while offset < len(segment):
+                piece = segment[offset:offset + missing]
+                offset += len(piece)
+                missing -= len(piece)
+                pieces.append(piece)
+                if missing == 0:
+                    yield pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+                    pieces = []
+                    missing = batch_size
+
+
+class AffineIFS:
+    """
+    An iterated function system (IFS) based on the chaos game for drawing the attractor of any number of affine maps.
+
+    Each map is given as a 3x3 matrix acting on points in homogeneous coordinates (1, x, y), so its first row is always
+    (1, 0, 0). The attractor is the only non-empty compact set which is the union of its images under the maps; for it
+    to exist, the maps must contract.
+
+    The chaos game starts at the fixed point of the first map, which lies on the attractor, and then repeatedly selects
+    one of the maps at random to apply. By default, the maps are selected with probabilities proportional to the areas
+    they map the unit square onto, the absolute values of their determinants. Every piece of the attractor is then
+    visited about as often as its area calls for, so that the pixels of an image fill up far more evenly, and the
+    completeness cutoff is reached with fewer points, than when all maps are equally likely.
+
+    Points are generated by a number of independent walkers which all start at the fixed point of the first map and
+    advance in lockstep: every step draws the map choices for all walkers at once and applies the maps to all of them
+    with one batched matrix product.
+
+    Points are generated in double precision by default. In single precision ('float32'), the walkers are held as (x, y)
+    rows of 32-bit floats instead of homogeneous coordinates of 64-bit floats, so every point takes 8 bytes instead of
+    24, and points are generated, retained and scaled onto pixels without ever being widened. Single precision resolves
+    about 2 ** 24 positions across the attractor, far more than the pixels of an image, and rounding errors do not add
+    up over the steps of the chaos game because the maps contract. Viewports zoomed into the attractor stay exact, since
+    the points are mapped onto the visible pieces in double precision.
+
+    For maximal efficiency, points generated are saved in an array which can be accessed later.
+    """
+    def __init__(self,
+                 maps: Sequence[npt.ArrayLike],
+                 weights: Literal['determinant'] | Literal['uniform'] | Sequence[float] = 'determinant',
+                 random_state=None,
+                 walkers: int = 1024,
+                 precision: Literal['float64'] | Literal['float32'] = 'float64') -> None:
+        """
+        Initializes a new AffineIFS.
+        :param maps: The matrices of the affine maps in homogeneous coordinates, each of shape (3, 3).
+        :param weights: 'determinant' to select the maps with probabilities proportional to the absolute values of their
+                        determinants, 'uniform' to select all maps with the same probability, or a weight for every map
+                        which the probabilities are proportional to (default: 'determinant').
+        :param random_state: A seed for initializing the random state of the iterated function system.
+        :param walkers: The number of independent walkers advanced in lockstep (default: 1024).
+        :param precision: 'float64' to generate points in double precision, or 'float32' to generate compact points in
+                          single precision, whose retained points take a third of the memory (default: 'float64').
+        """
+        self.maps = np.array(maps, dtype=np.float64)
+        if self.maps.ndim != 3 or self.maps.shape[1:] != (3, 3) or not len(self.maps):
+            raise ValueError(f'The maps must be given as an array of shape (n, 3, 3), not {self.maps.shape}')
+        self.weights = weights
+        self._rng = np.random.default_rng(random_state)
+        self.walkers = walkers
+        self.precision = precision
+
+        self._positions: npt.NDArray[np.float64] | None = None
+        self._pending: npt.NDArray[np.float64] | None = None
+        self._points = _PointStore()
+
+    @property
+    def probabilities(self) -> npt.NDArray[np.float64]:
+        """The probability of selecting each map in a step of the chaos game."""
+        if isinstance(self.weights, str):
+            if self.weights == 'uniform':
+                weights = np.ones(shape=len(self.maps))
+            elif self.weights == 'determinant':
+                weights = np.abs(np.linalg.det(self.maps[:, 1:, 1:]))
+                weights = np.maximum(weights, _MIN_WEIGHT * weights.sum())
+                if not weights.any():
+                    weights = np.ones(shape=len(self.maps))
+            else:
+                raise ValueError(f'Unknown weights: {self.weights!r}')
+        else:
+            weights = np.array(self.weights, dtype=np.float64)
+            if weights.shape != (len(self.maps),) or np.any(weights < 0) or not weights.sum() > 0:
+                raise ValueError(f'Expected {len(self.maps)} non-negative weights which are not all zero, '
+                                 f'not {self.weights}')
+        return weights / weights.sum()
+
+    @property
+    def points(self) -> npt.NDArray[np.float64]:
+        """The already-calculated points by this IFS."""
+        if not self._points:
+            raise RuntimeError('No points have been generated yet')
+
+        return self._points.array()
+
+    def set_random_state(self, state) -> None:
+        """
+        Sets the random state of the IFS. The walkers are moved back to the fixed point of the first map so that the
+        points generated afterwards only depend on the given state.
+        """
+        self._rng = np.random.default_rng(state)
+        self._positions = None
+        self._pending = None
+
+    def make_image(self,
+                   length: int,
+                   width: int,
+                   batch_size: int = 1000,
+                   completeness_cutoff: float = 0.99,
+                   color_theme: Literal['dark'] | Literal['light'] = 'dark',
+                   print_progress: bool = False,
+                   retain_points: bool = False,
+                   processes: int | None = None,
+                   padding: float = 0.05,
+                   bounds_tolerance: float = 0.01,
+                   method: Literal['chaos'] | Literal['addresses'] = 'chaos',
+                   supersampling: int = 1,
+                   kernel: Literal['box'] | Literal['tent'] = 'box',
+                   viewport: tuple[tuple[float, float], tuple[float, float]] | None = None,
+                   bounds: tuple[tuple[float, float], tuple[float, float]] | None = None,
+                   metrics: RenderMetrics | None = None) -> 'Image.Image':
+        """
+        Creates an image of the attractor this IFS generates. Points are generated in batches until a sufficient
+        proportion of the new points generated are already filled (until the attractor is sufficiently complete).
+
+        By default the image is rendered in streaming mode: every batch is rasterized and then dropped, so memory use is
+        bounded by the batch size no matter how long the attractor takes to complete. Already calculated points are not
+        used in this mode.
+
+        :param length: Length of the image, in pixels.
+        :param width: Width of the image, in pixels.
+        :param batch_size: The number of points processed at a time before checking for completeness.
+        :param completeness_cutoff: The proportion of points that need to already be filled by a previous batch before
+                                    point generation stops. (default: 0.99).
+        :param color_theme: Whether to use a dark or light background for the fractal image (default: 'dark').
+        :param print_progress: If True, print progress to the standard output (default: False).
+        :param retain_points: If True, already calculated points are drawn first and all generated points are kept in
+                              the points property (default: False).
+        :param processes: If given, the image is rendered by this many worker processes, each rendering at least
+                          batch_size points per round (see fractals.ifs.parallel.render_parallel).
+        :param padding: The margin around the attractor on each side, as a proportion of the larger side of its bounds
+                        (default: 0.05).
+        :param bounds_tolerance: The tolerance of the bounds of the attractor (see AffineIFS.bounds, default: 0.01).
+                                 Ignored if the bounds are given.
+        :param method: 'chaos' to render with the chaos game, or 'addresses' to render the points enumerated by
+                       AffineIFS.enumerate_points for the pieces which lie inside a single pixel or are a quarter of a
+                       pixel across, which covers the whole attractor at a known cost. Only pixels the attractor
+                       barely reaches into may be missed. The completeness cutoff is ignored for 'addresses' (default:
+                       'chaos').
+        :param supersampling: If greater than 1, every pixel is divided into this many subpixels in each direction and
+                              the image is anti-aliased (see fractals.ifs.render.SupersampledCanvas, default: 1).
+        :param kernel: The kernel used to filter subpixels down to pixels when supersampling, 'box' or 'tent' (default:
+                       'box').
+        :param viewport: The x and y bounds of the region to render, for example to zoom into the attractor. Points are
+                         only rendered onto the pieces of the attractor visible in the viewport, so the cost of a render
+                         stays about the same however far it zooms in. If not given, the whole attractor is rendered,
+                         with padding.
+        :param bounds: The x and y bounds of the attractor, if they are already known, so they are not calculated
+                       again. Any bounds containing the attractor will do, such as those of AffineIFS.bounds.
+        :param metrics: If given, the time spent in each phase of the render, its completeness curve and the sizes of
+                        its buffers are recorded into these metrics (see fractals.ifs.metrics.RenderMetrics).
+        :return: A PIL.Image.Image object that contains the image.
+        """
+        if metrics is not None:
+            metrics.start(length=length, width=width, batch_size=batch_size, completeness_cutoff=completeness_cutoff,
+                          processes=processes, method=method, supersampling=supersampling, viewport=viewport)
+        with _phase(metrics, 'bounds'):
+            x_bounds, y_bounds = viewport if viewport is not None else self._frame(padding, bounds_tolerance, bounds)
+        if supersampling > 1:
+            canvas = SupersampledCanvas(length, width, x_bounds, y_bounds, color_theme=color_theme,
+                                        supersampling=supersampling, kernel=kernel)
+        else:
+            canvas = BinaryCanvas(length, width, x_bounds, y_bounds, color_theme=color_theme)
+        with _phase(metrics, 'prefixes'):
+            prefixes = self._prefixes(x_bounds, y_bounds, bounds_tolerance, bounds) if viewport is not None else None
+        self._fill(canvas, batch_size, completeness_cutoff, print_progress=print_progress, retain_points=retain_points,
+                   processes=processes, method=method, prefixes=prefixes, metrics=metrics, bounds=bounds)
+        with _phase(metrics, 'encoding'):
+            image = canvas.to_image()
+        if metrics is not None:
+            metrics.finish()
+        return image
+
+    def render_tiled(self,
+                     length: int,
+                     width: int,
+                     path: str | os.PathLike | None = None,
+                     tile_size: int = 1024,
+                     memory_budget: int = 512 * 2 ** 20,
+                     batch_size: int | None = None,
+                     completeness_cutoff: float = 0.99,
+                     color_theme: Literal['dark'] | Literal['light'] = 'dark',
+                     print_progress: bool = False,
+                     padding: float = 0.05,
+                     bounds_tolerance: float = 0.01,
+                     method: Literal['chaos'] | Literal['addresses'] = 'chaos',
+                     viewport: tuple[tuple[float, float], tuple[float, float]] | None = None,
+                     metrics: RenderMetrics | None = None) -> TiledCanvas:
+        """
+        Renders an image of the attractor this IFS generates which is too large for memory, such as a poster-size
+        image, into a tiled canvas backed by a file. The canvas can then be written as PNG tiles or as a tiled TIFF file
+        (see fractals.ifs.render.TiledCanvas). Points are rendered in streaming mode, as in make_image.
+
+        :param length: Length of the image, in pixels.
+        :param width: Width of the image, in pixels.
+        :param path: The file holding the tiles. If not given, a temporary file is used, which is removed when the
+                     canvas is closed.
+        :param tile_size: The length and width of a tile, in pixels (default: 1024).
+        :param memory_budget: An upper limit on the number of bytes the render holds in memory at once, shared equally
+                              between the points of a batch and the tiles (default: 512 MiB). It limits memory use
+                              only; a larger budget keeps more tiles in memory but does not render faster.
+        :param batch_size: The number of points processed at a time before checking for completeness. If not given, the
+                           largest batch fitting into half the memory budget is used, but no fewer than 10^4 and no
+                           more than 10^6 points.
+        :param completeness_cutoff: The proportion of points that need to already be filled by a previous batch before
+                                    point generation stops. (default: 0.99).
+        :param color_theme: Whether to use a dark or light background for the fractal image (default: 'dark').
+        :param print_progress: If True, print progress to the standard output (default: False).
+        :param padding: The margin around the attractor on each side, as a proportion of the larger side of its bounds
+                        (default: 0.05).
+        :param bounds_tolerance: The tolerance of the bounds of the attractor (see AffineIFS.bounds, default: 0.01).
+        :param method: 'chaos' to render with the chaos game, or 'addresses' to render the points enumerated by
+                       AffineIFS.enumerate_points (see AffineIFS.make_image, default: 'chaos').
+        :param viewport: The x and y bounds of the region to render (see AffineIFS.make_image). If not given, the whole
+                         attractor is rendered, with padding.
+        :param metrics: If given, metrics of the render are recorded into them (see AffineIFS.make_image). Flushing the
+                        tiles to the file is recorded as encoding.
+        :return: The tiled canvas holding the image.
+        """
+        if batch_size is None:
+            batch_size = int(np.clip(memory_budget // (2 * _BYTES_PER_POINT), *_TILED_BATCH_SIZES))
+        if metrics is not None:
+            metrics.start(length=length, width=width, batch_size=batch_size, completeness_cutoff=completeness_cutoff,
+                          method=method, tile_size=tile_size, memory_budget=memory_budget, viewport=viewport)
+        with _phase(metrics, 'bounds'):
+            x_bounds, y_bounds = viewport if viewport is not None else self._frame(padding, bounds_tolerance)
+        canvas = TiledCanvas(length, width, x_bounds, y_bounds, path=path, tile_size=tile_size,
+                             memory_budget=memory_budget // 2, color_theme=color_theme)
+        with _phase(metrics, 'prefixes'):
+            prefixes = self._prefixes(x_bounds, y_bounds, bounds_tolerance) if viewport is not None else None
+        self._fill(canvas, batch_size, completeness_cutoff, print_progress=print_progress, method=method,
+                   prefixes=prefixes, metrics=metrics)
+        with _phase(metrics, 'encoding'):
+            canvas.flush()
+        if metrics is not None:
+            metrics.finish()
+        return canvas
+
+    def accumulate_density(self,
+                           length: int,
+                           width: int,
+                           npoints: int | None = None,
+                           batch_size: int = 10000,
+                           completeness_cutoff: float = 0.99,
+                           buffer: DensityBuffer | None = None,
+                           print_progress: bool = False,
+                           retain_points: bool = False,
+                           processes: int | None = None,
+                           padding: float = 0.05,
+                           bounds_tolerance: float = 0.01,
+                           method: Literal['chaos'] | Literal['addresses'] = 'chaos',
+                           viewport: tuple[tuple[float, float], tuple[float, float]] | None = None,
+                           metrics: RenderMetrics | None = None) -> DensityBuffer:
+        """
+        Counts how many points of the attractor this IFS generates fall into each pixel. Points are generated in batches
+        until the given number of points is reached or, if no number is given, until the attractor is sufficiently
+        complete. The result can be tone mapped into an image with DensityBuffer.to_image.
+
+        :param length: Length of the buffer, in pixels. Ignored if a buffer is given.
+        :param width: Width of the buffer, in pixels. Ignored if a buffer is given.
+        :param npoints: The number of points to generate. If not given, points are generated until the completeness
+                        cutoff is reached.
+        :param batch_size: The number of points processed at a time before checking for completeness.
+        :param completeness_cutoff: The proportion of points that need to already be filled by a previous batch before
+                                    point generation stops. (default: 0.99).
+        :param buffer: A density buffer to add the counts to, for example from an earlier run. Its bounds are used
+                       instead of calculating new ones, so the counts of both runs line up.
+        :param print_progress: If True, print progress to the standard output (default: False).
+        :param retain_points: If True, already calculated points are counted first and all generated points are kept in
+                              the points property (default: False).
+        :param processes: If given, the counts are accumulated by this many worker processes, each rendering at least
+                          batch_size points per round (see fractals.ifs.parallel.render_parallel).
+        :param padding: The margin around the attractor on each side, as a proportion of the larger side of its bounds
+                        (default: 0.05). Ignored if a buffer is given.
+        :param bounds_tolerance: The tolerance of the bounds of the attractor (see AffineIFS.bounds, default: 0.01).
+                                 Ignored if a buffer is given.
+        :param method: 'chaos' to count the points of the chaos game, or 'addresses' to count the points enumerated by
+                       AffineIFS.enumerate_points down to a quarter of a pixel. The number of points and the
+                       completeness cutoff are ignored for 'addresses' (default: 'chaos').
+        :param viewport: The x and y bounds of the region to count points in (see AffineIFS.make_image). The number of
+                         points includes the points which miss the viewport. If a buffer is given, its bounds are used
+                         as the viewport instead, so a zoomed run is continued by giving its buffer and any viewport.
+        :param metrics: If given, metrics of the render are recorded into them (see AffineIFS.make_image).
+        :return: The density buffer holding the counts.
+        """
+        if metrics is not None:
+            metrics.start(batch_size=batch_size, completeness_cutoff=completeness_cutoff, npoints=npoints,
+                          processes=processes, method=method, viewport=viewport)
+        if buffer is None:
+            with _phase(metrics, 'bounds'):
+                x_bounds, y_bounds = viewport if viewport is not None else self._frame(padding, bounds_tolerance)
+            buffer = DensityBuffer(length, width, x_bounds, y_bounds)
+        with _phase(metrics, 'prefixes'):
+            prefixes = self._prefixes(buffer.x_bounds, buffer.y_bounds, bounds_tolerance) \
+                if viewport is not None else None
+        self._fill(buffer, batch_size, completeness_cutoff, npoints, print_progress, retain_points, processes, method,
+                   prefixes, metrics)
+        if metrics is not None:
+            metrics.finish()
+        return buffer
+
+    def render_progressive(self,
+                           length: int,
+                           width: int,
+                           every: int = 10,
+                           batch_size: int = 10000,
+                           completeness_cutoff: float = 0.99,
+                           npoints: int | None = None,
+                           checkpoint: str | os.PathLike | None = None,
+                           color_theme: Literal['dark'] | Literal['light'] = 'dark',
+                           padding: float = 0.05,
+                           bounds_tolerance: float = 0.01,
+                           supersampling: int = 1,
+                           kernel: Literal['box'] | Literal['tent'] = 'box',
+                           density: bool = False) -> Generator[RenderState, None, None]:
+        """
+        Renders the attractor this IFS generates progressively. Points are rendered in batches as in make_image, or
+        counted as in accumulate_density if density is True, but every few batches the state of the render is yielded,
+        holding the canvas rendered so far and the completeness and throughput of the render. The canvas can be
+        converted into a preview image while the render goes on. The last state yielded is the finished render.
+
+        The state can be saved with RenderState.save to resume the render later, which is done automatically if a
+        checkpoint file is given: the state is saved to it whenever it is yielded, and if the file already exists when
+        the render starts, the render resumes from the state saved in it. A render which is killed therefore only loses
+        the batches since the state was last yielded, and the resumed render generates the same points as an
+        uninterrupted one would have.
+
+        :param length: Length of the image, in pixels. Ignored when resuming from a checkpoint.
+        :param width: Width of the image, in pixels. Ignored when resuming from a checkpoint.
+        :param every: The number of batches rendered between yielded states (default: 10).
+        :param batch_size: The number of points processed at a time before checking for completeness (default: 10000).
+        :param completeness_cutoff: The proportion of points that need to already be filled by a previous batch before
+                                    point generation stops. (default: 0.99).
+        :param npoints: The number of points to render. If given, the completeness cutoff is ignored.
+        :param checkpoint: A .npz file the state is saved to whenever it is yielded, and resumed from if it exists.
+        :param color_theme: Whether to use a dark or light background for the fractal image (default: 'dark').
+        :param padding: The margin around the attractor on each side, as a proportion of the larger side of its bounds
+                        (default: 0.05).
+        :param bounds_tolerance: The tolerance of the bounds of the attractor (see AffineIFS.bounds, default: 0.01).
+        :param supersampling: If greater than 1, the image is anti-aliased as in make_image (default: 1).
+        :param kernel: The kernel used to filter subpixels down to pixels when supersampling (default: 'box').
+        :param density: If True, points are counted into a DensityBuffer instead of being drawn (default: False).
+        :return: A generator of the state of the render, which is the same object updated in place.
+        """
+        if checkpoint is not None and os.path.exists(checkpoint):
+            state = RenderState.load(checkpoint)
+            if not np.array_equal(state.maps, self.maps):
+                raise ValueError(f'The render saved in {checkpoint} was made with different maps')
+            if state.positions is not None and (state.positions.dtype, state.positions.shape[1]) != self._layout():
+                raise ValueError(f'The render saved in {checkpoint} was made with a different precision')
+            rng = np.random.Generator(getattr(np.random, state.random_state['bit_generator'])())
+            rng.bit_generator.state = state.random_state
+            self._rng, self._positions, self._pending = rng, state.positions, state.pending
+        else:
+            x_bounds, y_bounds = self._frame(padding, bounds_tolerance)
+            if density:
+                canvas = DensityBuffer(length, width, x_bounds, y_bounds)
+            elif supersampling > 1:
+                canvas = SupersampledCanvas(length, width, x_bounds, y_bounds, color_theme=color_theme,
+                                            supersampling=supersampling, kernel=kernel)
+            else:
+                canvas = BinaryCanvas(length, width, x_bounds, y_bounds, color_theme=color_theme)
+            state = RenderState(canvas, self.maps.copy())
+
+        def finished() -> bool:
+            return (state.completeness >= completeness_cutoff) if npoints is None else (state.npoints >= npoints)
+
+        # A render resumed after it finished has nothing left to render.
+        state.done = state.nbatches > 0 and finished()
+        if state.done:
+            yield state
+            return
+        while not state.done:
+            start = time.perf_counter()
+            rendered = 0
+            for _ in range(every):
+                points = self._advance(batch_size if npoints is None else min(batch_size, npoints - state.npoints))
+                state.completeness = state.canvas.add(points) / len(points)
+                state.npoints += len(points)
+                state.nbatches += 1
+                rendered += len(points)
+                if finished():
+                    break
+            elapsed = time.perf_counter() - start
+            state.elapsed += elapsed
+            state.points_per_second = rendered / elapsed
+            state.done = finished()
+            state.random_state = self._rng.bit_generator.state
+            state.positions, state.pending = self._positions.copy(), self._pending.copy()
+            if checkpoint is not None:
+                state.save(checkpoint)
+            yield state
+
+    def box_dimension(self,
+                      max_level: int = 10,
+                      batch_size: int = 100000,
+                      completeness_cutoff: float = 0.99,
+                      npoints: int = 10 ** 8,
+                      min_points_per_box: float = 4,
+                      bounds_tolerance: float = 0.01,
+                      print_progress: bool = False) -> DimensionEstimate:
+        """
+        Estimates the box-counting dimension of the attractor this IFS generates from a single stream of points of the
+        chaos game. Every batch of points fills the grids of boxes at all levels at once (see BoxCounter), so the cost
+        is that of generating the points once rather than of a render at every scale. Points are generated until the
+        completeness at the finest level reaches the cutoff, as for an image of 2 ** max_level by 2 ** max_level pixels,
+        and are not retained.
+
+        Curves which do not contract are cut off at the bounds found by AffineIFS.bounds; the few points outside them
+        are not counted.
+
+        :param max_level: The finest level, whose boxes are 2 ** max_level times smaller than the bounds of the
+                          attractor (default: 10).
+        :param batch_size: The number of points processed at a time before checking for completeness (default: 100000).
+        :param completeness_cutoff: The proportion of points of a batch that need to fall into boxes of the finest level
+                                    which are already occupied before point generation stops (default: 0.99).
+        :param npoints: The largest number of points generated, in case the cutoff is not reached (default: 10 ** 8).
+        :param min_points_per_box: The smallest average number of points in an occupied box of the levels fitted (see
+                                   BoxCounter.fit_levels, default: 4).
+        :param bounds_tolerance: The tolerance of the bounds of the attractor (see AffineIFS.bounds, default: 0.01).
+        :param print_progress: If True, print the completeness of the finest level as points are generated (default:
+                               False).
+        :return: The estimated dimension.
+        """
+        counter = BoxCounter(*self.bounds(bounds_tolerance), max_level)
+        progress = _ProgressPrinter(completeness_cutoff, print_progress)
+        generated = 0
+        for points in self.generate_points(batch_size, retain=False):
+            points = points[:npoints - generated]
+            generated += len(points)
+            counter.add(points)
+            if counter.completeness[-1] >= completeness_cutoff or generated >= npoints:
+                progress.done()
+                break
+            progress.update(counter.completeness[-1])
+        return counter.fit(min_points_per_box=min_points_per_box)
+
+    def bounds(self, tolerance: float = 0.01) -> tuple[tuple[float, float], tuple[float, float]]:
+        """
+        Calculates bounds which are guaranteed to contain the whole attractor from the maps alone, without generating
+        any points, if the maps contract.
+
+        The piece of the attractor with the address w, a string of indices of the maps, is the image of the whole
+        attractor under the composition f_w of the maps, and contains the images of the fixed points of the maps under
+        f_w. These images for the pieces down to a fixed depth give a first estimate of the bounds. This estimate is
+        widened until it is shown to contain the attractor, by subdividing the pieces until each maps the widened box
+        into itself. Every side of the bounds is then tightened by branch and bound over the pieces, only subdividing
+        pieces which may reach past the furthest point found so far. Pieces are subdivided level by level, with one
+        batched matrix product per level. The work of every search is limited, so attractors whose pieces shrink slowly
+        are bounded less tightly rather than taking long.
+
+        Some maps, such as those of several of the curves in the cookbook, do not contract: some composition of them has
+        a spectral radius of at least 1, even if every map on its own has a smaller one. Their points are not bounded
+        at all; the chaos game only reaches far away points very rarely. For these maps the bounds of the first estimate
+        and of a sample of points of the chaos game, widened by the tolerance, are returned instead. The sample is drawn
+        from a random state of its own, so it does not change the points generated by this IFS.
+
+        :param tolerance: The largest proportion of the diagonal of the first estimate by which the bounds may exceed
+                          the attractor on each side. Must be positive (default: 0.01).
+        :return: The x and y bounds of the attractor.
+        """
+        if tolerance <= 0:
+            raise ValueError(f'The tolerance must be positive, not {tolerance}')
+
+        maps = self.maps
+        ends = np.stack([_fixed_point(matrix) for matrix in maps], axis=1)
+        pieces = np.identity(3)[np.newaxis]
+        contracting = True
+        for _ in range(_ENDPOINT_DEPTH):
+            if len(pieces) * len(maps) > _ENDPOINT_PIECES:
+                break
+            pieces = _subdivide(pieces, maps)
+            # A composition of the maps which does not contract means that the maps do not contract either. Rounding
+            # errors must not turn a spectral radius of exactly 1 into a contraction.
+            contracting &= bool(np.all(np.abs(np.linalg.eigvals(pieces[:, 1:, 1:])) < 1 - 1e-9))
+        endpoints = np.concatenate((ends[1:], np.concatenate(pieces @ ends, axis=1)[1:]), axis=1)
+        mins, maxs = endpoints.min(axis=1), endpoints.max(axis=1)
+        diagonal = np.hypot(*(maxs - mins)) or 1.0
+
+        center = np.concatenate(([1], (mins + maxs) / 2))
+        half = (maxs - mins) / 2 + diagonal / 4
+        try:
+            for _ in range(_WIDENINGS if contracting else 0):
+                if _contains_attractor(maps, center, half):
+                    break
+                half += diagonal
+            else:
+                raise _NotContractingError('No box containing the attractor was found')
+
+            # Every pass tightens the box containing the attractor, which lets the next pass drop pieces earlier.
+            slack = diagonal
+            while slack > tolerance * diagonal:
+                slack = max(slack / 4, tolerance * diagonal)
+                x_min, x_max, y_min, y_max = (sign * _extent(maps, ends, center, half, sign * axis, slack)
+                                              for axis in np.identity(2) for sign in (-1, 1))
+                center = np.array([1, (x_min + x_max) / 2, (y_min + y_max) / 2])
+                half = np.array([(x_max - x_min) / 2, (y_max - y_min) / 2])
+            return (x_min, x_max), (y_min, y_max)
+        except _NotContractingError:
+            # Without contracting maps no bounds contain every point the chaos game can reach, so the points found on
+            # the pieces and the points the chaos game reaches are bounded instead.
+            sample = copy.copy(self)
+            sample.clear()
+            sample.set_random_state(0)
+            points = sample._advance(_SAMPLE_POINTS)
+            mins, maxs = np.minimum(mins, points.min(axis=0)), np.maximum(maxs, points.max(axis=0))
+            margin = tolerance * np.hypot(*(maxs - mins))
+            return (mins[0] - margin, maxs[0] + margin), (mins[1] - margin, maxs[1] + margin)
+
+    def calculate_points(self, nsteps: int) -> None:
+        """
+        Calculates the given number of points on the attractor. These new points are added to the points property
+        to be accessed later.
+
+        :param nsteps: The number of points to generate.
+        """
+        self._points.append(self._advance(nsteps))
+
+    def generate_points(self, batch_size: int, retain: bool = True) -> Generator[npt.NDArray[np.float64], None, None]:
+        """
+        Generates points in batches. Points that have already been generated will be yielded first, but still in the
+        necessary batches.
+        :param batch_size: The number of points in each batch.
+        :param retain: If False, only new points are yielded and they are not added to the points property, so memory
+                       use stays bounded by the batch size (default: True).
+        :return: A generator of points in the batch size given.
+        """
+        if not retain:
+            while True:
+                yield self._advance(batch_size)
+
+        # Top up the stored points to a whole number of batches before replaying them.
+        if (remainder := len(self._points) % batch_size) or not self._points:
+            self._points.append(self._advance(batch_size - remainder))
+        yield from self._points.batches(batch_size)
+
+        while True:
+            points = self._advance(batch_size)
+            self._points.append(points)
+            yield points
+
+    def enumerate_points(self,
+                         resolution: tuple[float, float] | None = None,
+                         max_depth: int = 24,
+                         batch_size: int = 100000,
+                         tolerance: float = 0.01,
+                         viewport: tuple[tuple[float, float], tuple[float, float]] | None = None,
+                         grid: tuple[tuple[float, float], tuple[float, float]] | None = None,
+                         bounds: tuple[tuple[float, float], tuple[float, float]] | None = None
+                         ) -> Generator[npt.NDArray[np.float64], None, None]:
+        """
+        Enumerates points of the attractor deterministically along the tree of addresses, in the order of the addresses.
+
+        The piece of the attractor with the address w, a string of indices of the maps, is the image of the whole
+        attractor under the composition f_w of the maps. Pieces are subdivided level by level, with one batched matrix
+        product per level, until they are smaller than the resolution, lie inside a single cell of the grid or have
+        reached the maximum depth. The images of the fixed point of the first map under these pieces are yielded in the
+        order of their addresses, followed by the fixed point of the last map. For curves such as de Rham curves,
+        consecutive points are then the ends of consecutive pieces of the curve and can be joined into a polyline.
+        Without a resolution every address of the maximum depth is enumerated, which gives n ** max_depth + 1 points for
+        n maps.
+
+        :param resolution: The size in the x and y directions which every piece must be smaller than, such as the size
+                           of a pixel. Sizes of pieces are bounded with the bounds of the attractor.
+        :param max_depth: The largest depth of the addresses (default: 24).
+        :param batch_size: The largest number of points yielded, and of pieces subdivided, at a time (default: 100000).
+        :param tolerance: The tolerance of the bounds of the attractor (see AffineIFS.bounds, default: 0.01).
+        :param viewport: If given, pieces which lie outside these x and y bounds are not enumerated, so zooming into the
+                         attractor does not enumerate the pieces outside the zoomed region. Points of the remaining
+                         pieces may still lie slightly outside the viewport.
+        :param grid: The size in the x and y directions of the cells of a grid, and the lower left corner of one of its
+                     cells, such as the pixels of an image. Pieces which lie inside a single cell are not subdivided any
+                     further, so their points fill exactly the cells the pieces lie in. Together with a resolution
+                     smaller than the cells, every cell the attractor reaches into by more than the resolution is
+                     filled.
+        :param bounds: The x and y bounds of the attractor, if they are already known (see AffineIFS.make_image).
+        :return: A generator of points in the order of their addresses, in batches of at most the batch size.
+        """
+        nmaps = len(self.maps)
+        start, end = _fixed_point(self.maps[0]), _fixed_point(self.maps[-1])
+        # The identity map keeps pieces which are already small enough while the others are subdivided.
+        maps = np.concatenate((self.maps, np.identity(3)[np.newaxis]))
+        if resolution is not None or viewport is not None or grid is not None:
+            (x_min, x_max), (y_min, y_max) = bounds if bounds is not None else self.bounds(tolerance)
+            center = np.array([1, (x_min + x_max) / 2, (y_min + y_max) / 2])
+            half = np.array([x_max - x_min, y_max - y_min]) / 2
+
+        finished = []
+        nfinished = 0
+        # The stack holds pieces in the order of their addresses, with the pieces to be enumerated first on top.
+        stack = [(np.identity(3)[np.newaxis], np.zeros(shape=1, dtype=np.intp))]
+        while stack:
+            pieces, depths = stack.pop()
+            if viewport is not None:
+                centers, halves = (pieces @ center)[:, 1:], np.abs(pieces[:, 1:, 1:]) @ half
+                visible = np.all((centers + halves >= [viewport[0][0], viewport[1][0]])
+                                 & (centers - halves <= [viewport[0][1], viewport[1][1]]), axis=1)
+                pieces, depths = pieces[visible], depths[visible]
+            done = depths >= max_depth
+            if resolution is not None:
+                done |= np.all(2 * np.abs(pieces[:, 1:, 1:]) @ half <= resolution, axis=1)
+            if grid is not None:
+                centers, halves = (pieces @ center)[:, 1:], np.abs(pieces[:, 1:, 1:]) @ half
+                cell, corner = np.asarray(grid[0]), np.asarray(grid[1])
+                lower = np.floor((centers - halves - corner) / cell)
+                upper = np.floor((centers + halves - corner) / cell)
+                done |= np.all(lower == upper, axis=1)
+
+            # Finished pieces at the front are enumerated right away, so they are not carried along any further.
+            front = len(done) if done.all() else np.argmin(done)
+            if front:
+                finished.append((pieces[:front] @ start)[:, 1:])
+                nfinished += front
+                while nfinished >= batch_size:
+                    points = np.concatenate(finished)
+                    yield points[:batch_size]
+                    finished = [points[batch_size:]]
+                    nfinished -= batch_size
+            pieces, depths, done = pieces[front:], depths[front:], done[front:]
+            if not len(pieces):
+                continue
+
+            if nmaps * len(pieces) > batch_size > 1:
+                middle = len(pieces) // 2
+                stack.append((pieces[middle:], depths[middle:]))
+                stack.append((pieces[:middle], depths[:middle]))
+                continue
+            # Every unfinished piece is followed by its children in the order of the maps, a finished piece by itself.
+            counts = np.where(done, 1, nmaps)
+            children = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            choices = np.where(np.repeat(done, counts), nmaps, children)
+            stack.append((np.repeat(pieces, counts, axis=0) @ maps[choices], np.repeat(depths + ~done, counts)))
+
+        finished.append(end[np.newaxis, 1:])
+        points = np.concatenate(finished)
+        for index in range(0, len(points), batch_size):
+            yield points[index:index + batch_size]
+
+    def spawn(self, n: int) -> list['AffineIFS']:
+        """
+        Creates copies of this IFS with independent, non-overlapping random streams spawned from its random state. The
+        copies start at the fixed point of the first map and have no calculated points.
+        :param n: The number of copies.
+        :return: The copies of this IFS.
+        """
+        copies = []
+        for rng in self._rng.spawn(n):
+            ifs = copy.copy(self)
+            ifs.clear()
+            ifs._rng = rng
+            copies.append(ifs)
+        return copies
+
+    def clear(self) -> None:
+        """
+        Clears all generated points in this IFS and moves the walkers back to the fixed point of the first map.
+        Generators created before this function is called should be ignored.
+        """
+        self._points = _PointStore()
+        self._positions = None
+        self._pending = None
+
+    def _frame(self,
+               padding: float,
+               tolerance: float,
+               bounds: tuple[tuple[float, float], tuple[float, float]] | None = None
+               ) -> tuple[tuple[float, float], tuple[float, float]]:
+        """
+        Returns the bounds of the attractor with a margin of the given proportion of their larger side on each side. The
+        bounds are only calculated if they are not given.
+        """
+        (x_min, x_max), (y_min, y_max) = bounds if bounds is not None else self.bounds(tolerance)
+        margin = padding * max(x_max - x_min, y_max - y_min)
+        return (x_min - margin, x_max + margin), (y_min - margin, y_max + margin)
+
+    def _prefixes(self,
+                  x_bounds: tuple[float, float],
+                  y_bounds: tuple[float, float],
+                  tolerance: float,
+                  bounds: tuple[tuple[float, float], tuple[float, float]] | None = None) -> _Prefixes:
+        """
+        Finds the pieces of the attractor which are visible in the viewport with the given bounds. Pieces are subdivided
+        level by level, dropping those whose bounds miss the viewport, until they lie inside the viewport or are several
+        times smaller than it, so the number of pieces found does not grow as the viewport shrinks. The bounds of the
+        attractor are only calculated if they are not given.
+        """
+        (x_min, x_max), (y_min, y_max) = bounds if bounds is not None else self.bounds(tolerance)
+        center = np.array([1, (x_min + x_max) / 2, (y_min + y_max) / 2])
+        half = np.array([x_max - x_min, y_max - y_min]) / 2
+        lower, upper = np.array([x_bounds[0], y_bounds[0]]), np.array([x_bounds[1], y_bounds[1]])
+        size = (upper - lower).max() / _PREFIX_SCALE
+        # Weights are kept as logarithms, since the probabilities of pieces deep inside a zoom underflow.
+        with np.errstate(divide='ignore'):
+            log_probabilities = np.log(self.probabilities)
+
+        pieces, log_weights = np.identity(3)[np.newaxis], np.zeros(shape=1)
+        prefixes, prefix_log_weights = [], []
+        for depth in range(_MAX_DEPTH):
+            centers, halves = (pieces @ center)[:, 1:], np.abs(pieces[:, 1:, 1:]) @ half
+            visible = np.all((centers + halves >= lower) & (centers - halves <= upper), axis=1)
+            visible &= np.isfinite(log_weights)
+            # All points of a piece inside the viewport are visible, and few points of a small piece are not.
+            final = np.all((centers - halves >= lower) & (centers + halves <= upper), axis=1)
+            final |= 2 * halves.max(axis=1) <= size
+            prefixes.append(pieces[visible & final])
+            prefix_log_weights.append(log_weights[visible & final])
+            pieces, log_weights = pieces[visible & ~final], log_weights[visible & ~final]
+            if not len(pieces):
+                break
+            if len(pieces) * len(self.maps) > _MAX_PIECES:
+                # Pieces which shrink slowly, or not at all for maps which do not contract, are used as they are, so
+                # more of their points miss the viewport.
+                break
+            pieces = _subdivide(pieces, self.maps)
+            log_weights = (log_weights[:, np.newaxis] + log_probabilities).reshape(-1)
+        prefixes.append(pieces)
+        prefix_log_weights.append(log_weights)
+
+        log_weights = np.concatenate(prefix_log_weights)
+        if not len(log_weights):
+            raise ValueError(f'The viewport {x_bounds}, {y_bounds} does not show any part of the attractor')
+        return _Prefixes(np.concatenate(prefixes), np.exp(log_weights - log_weights.max()), x_bounds, y_bounds, depth)
+
+    def _fill(self,
+              canvas: Canvas,
+              batch_size: int,
+              completeness_cutoff: float,
+              npoints: int | None = None,
+              print_progress: bool = False,
+              retain_points: bool = False,
+              processes: int | None = None,
+              method: Literal['chaos'] | Literal['addresses'] = 'chaos',
+              prefixes: _Prefixes | None = None,
+              metrics: RenderMetrics | None = None,
+              bounds: tuple[tuple[float, float], tuple[float, float]] | None = None) -> None:
+        """
+        Renders batches of points into the canvas until the given number of points has been rendered or, if no number is
+        given, until the completeness cutoff is reached. With the 'addresses' method, the points of the pieces which
+        lie inside a single pixel, or are several times smaller than a pixel, are rendered instead. If the pieces
+        visible in a viewport are given, points are only rendered onto them, and completeness is measured over the
+        points which fall into the viewport. If metrics are given, every batch is recorded into them. The bounds of the
+        attractor are only needed by the 'addresses' method, which calculates them if they are not given.
+        """
+        if metrics is not None:
+            metrics.add_buffer('canvas', canvas.data.nbytes)
+        if method == 'addresses':
+            if processes is not None or retain_points:
+                raise ValueError('Enumerated points cannot be retained or rendered with several processes')
+            progress = _ProgressPrinter(completeness_cutoff, print_progress)
+            # A piece only fills the pixel of its first point, so pieces straddling pixels are subdivided further to
+            # reach the other pixels they pass through. Counts must not depend on how the pieces line up with the
+            # pixels though, so the pieces counted into density buffers are all subdivided down to the resolution.
+            resolution = tuple(size / _ADDRESS_SCALE for size in canvas.pixel_size)
+            grid = None if isinstance(canvas, DensityBuffer) else (canvas.pixel_size,
+                                                                   (canvas.x_bounds[0], canvas.y_bounds[0]))
+            if prefixes is not None:
+                # The pieces of a zoomed viewport are deeper than those of the whole attractor by the depth of the
+                # visible pieces.
+                batches = self.enumerate_points(resolution, max_depth=24 + prefixes.depth, batch_size=batch_size,
+                                                viewport=(canvas.x_bounds, canvas.y_bounds), grid=grid, bounds=bounds)
+            else:
+                batches = self.enumerate_points(resolution, batch_size=batch_size, grid=grid, bounds=bounds)
+            clock = time.perf_counter()
+            for points in batches:
+                if prefixes is not None:
+                    points = prefixes.visible(points)
+                if metrics is not None:
+                    metrics.add_time('generation', time.perf_counter() - clock)
+                    metrics.add_buffer('points', points.nbytes)
+                canvas.add(points, metrics)
+                if metrics is not None:
+                    # Enumerated points cover the attractor exactly once, so their completeness says nothing.
+                    metrics.add_batch(len(points), None)
+                clock = time.perf_counter()
+            progress.done()
+            return
+        if method != 'chaos':
+            raise ValueError(f'Unknown rendering method: {method!r}')
+
+        if processes is not None:
+            if retain_points:
+                raise ValueError('Points cannot be retained when rendering with several processes')
+            from fractals.ifs.parallel import render_parallel  # Slow to import, and only needed with processes
+            render_parallel(self, canvas, processes, batch_size, completeness_cutoff, npoints, print_progress, prefixes,
+                            metrics)
+            return
+
+        progress = _ProgressPrinter(completeness_cutoff, print_progress)
+        rendered = 0
+        clock = time.perf_counter()
+        for points in self.generate_points(batch_size, retain=retain_points):
+            if npoints is not None:
+                points = points[:npoints - rendered]
+                rendered += len(points)
+            if prefixes is not None:
+                points = prefixes.apply(self._rng, points)
+            if metrics is not None:
+                metrics.add_time('generation', time.perf_counter() - clock)
+                metrics.add_buffer('points', points.nbytes)
+            completeness = canvas.add(points, metrics) / max(len(points), 1)
+            if metrics is not None:
+                metrics.add_batch(len(points), completeness)
+                if retain_points:
+                    metrics.add_buffer('retained_points', self._points.nbytes)
+            clock = time.perf_counter()
+            if (completeness >= completeness_cutoff) if npoints is None else (rendered >= npoints):
+                progress.done()
+                break
+            progress.update(completeness)
+
+    def _layout(self) -> tuple[np.dtype, int]:
+        """Returns the type of the coordinates of the walkers, and the number of columns they are held in."""
+        match self.precision:
+            case 'float64':
+                return np.dtype(np.float64), 3
+            case 'float32':
+                return np.dtype(np.float32), 2
+            case _:
+                raise ValueError(f'Unknown precision: {self.precision!r}')
+
+    def _advance(self, npoints: int) -> npt.NDArray[np.floating]:
+        """
+        Advances all walkers in lockstep until the given number of new points have been generated. Points of the last
+        step which are not needed are kept for the next call, so the sequence of points does not depend on how it is
+        split into calls.
+
+        In double precision the walkers are held in homogeneous coordinates, and every step is one batched product with
+        the 3x3 matrices of the chosen maps. In single precision they are held as (x, y) rows, and every step applies
+        the linear parts of the chosen maps and adds their offsets. Both draw the same map choices from the random
+        state.
+
+        :param npoints: The number of points to generate.
+        :return: The generated points, one (x, y) row per point in the precision of the IFS, ordered step by step.
+        """
+        dtype, ncolumns = self._layout()
+        if (self._positions is None or self._positions.shape != (self.walkers, ncolumns)
+                or self._positions.dtype != dtype):
+            start = _fixed_point(self.maps[0])
+            self._positions = np.tile(start[-ncolumns:], (self.walkers, 1)).astype(dtype)
+            self._pending = None
+
+        # In both layouts the coordinates are the last two columns.
+        pending = self._pending if self._pending is not None else np.empty(shape=(0, ncolumns), dtype=dtype)
+        if npoints <= len(pending):
+            self._pending = pending[npoints:]
+            return pending[:npoints, -2:]
+
+        maps = self.maps
+        nsteps = -(-(npoints - len(pending)) // self.walkers)
+        thresholds = np.cumsum(self.probabilities)
+        thresholds[-1] = 1
+        if ncolumns == 2:
+            # The coefficients of x' = a x + b y + e and y' = c x + d y + f, one row per map. Applying them coordinate
+            # by coordinate into the output is faster than a batched product of 2x2 matrices.
+            coefficients = np.concatenate((maps[:, 1, [1, 2, 0]], maps[:, 2, [1, 2, 0]]), axis=1).astype(dtype)
+        points = np.empty(shape=(nsteps, self.walkers, ncolumns), dtype=dtype)
+        positions = self._positions
+        for first in range(0, nsteps, _CHOICE_STEPS):
+            # A random array holds the map choices of every walker for a block of steps; a map is chosen when the
+            # random number falls into its interval of the cumulative probabilities. Blocks take the same random numbers
+            # as drawing the choices of all steps at once, but keep the temporary arrays small.
+            random = self._rng.random((min(_CHOICE_STEPS, nsteps - first), self.walkers))
+            for step, choices in enumerate(np.searchsorted(thresholds, random, side='right'), start=first):
+                if ncolumns == 3:
+                    positions = points[step] = np.einsum('nij,nj->ni', maps[choices], positions)
+                    continue
+                a, b, e, c, d, f = coefficients[choices].T
+                x, y = positions[:, 0], positions[:, 1]
+                positions = points[step]
+                np.multiply(a, x, out=positions[:, 0])
+                positions[:, 0] += b * y
+                positions[:, 0] += e
+                np.multiply(c, x, out=positions[:, 1])
+                positions[:, 1] += d * y
+                positions[:, 1] += f
+        # A copy, since a view of the last step would keep all points of this call alive after they are dropped.
+        self._positions = positions.copy()
+        points = points.reshape(-1, ncolumns)
+        if len(pending):
+            points = np.concatenate((pending, points))
+        self._pending = points[npoints:].copy()
+        return points[:npoints, -2:]
+
+
+def barnsley_fern_ifs(random_state=None) -> AffineIFS:
+    """
+    Returns the IFS generating the Barnsley fern, made of four maps: the stem, the successively smaller leaflets, and
+    the largest left and right leaflets.
+    :param random_state: A seed for initializing the random state of the iterated function system.
+    :return: An AffineIFS object for the iterated function system of the fern.
+    """
+    return AffineIFS([_affine_matrix([[ 0.00,  0.00], [ 0.00, 0.16]], [0, 0.00]),
+                      _affine_matrix([[ 0.85,  0.04], [-0.04, 0.85]], [0, 1.60]),
+                      _affine_matrix([[ 0.20, -0.26], [ 0.23, 0.22]], [0, 1.60]),
+                      _affine_matrix([[-0.15,  0.28], [ 0.26, 0.24]], [0, 0.44])],
+                     random_state=random_state)
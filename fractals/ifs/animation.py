@@ -0,0 +1,231 @@
+"""Rendering animations of one-parameter families of iterated function systems, such as the Cesàro curves."""
+
+
+from collections import deque
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+import io
+import itertools
+import os
+from pathlib import Path
+import struct
+from typing import Any, TYPE_CHECKING
+import zlib
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from fractals.ifs.affine import AffineIFS
+
+
+__all__ = ['render_animation']
+
+
+class _FrameDirectory:
+    """Writes every frame into its own image file in a directory, named after its index."""
+    def __init__(self, directory: Path, file_format: str = 'png') -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.file_format = file_format
+        self._index = 0
+
+    def write(self, image: 'Image.Image') -> None:
+        image.save(self.directory / f'{self._index:05d}.{self.file_format}')
+        self._index += 1
+
+    def close(self) -> None:
+        pass
+
+
+class _GifWriter:
+    """Writes frames into an animated GIF file one at a time, sharing a grayscale palette."""
+    def __init__(self, path: Path, duration: int, loop: int) -> None:
+        self._file = open(path, 'wb')
+        self.duration = duration
+        self.loop = loop
+        self._started = False
+
+    def write(self, image: 'Image.Image') -> None:
+        from PIL import GifImagePlugin  # Only needed for writing GIF files
+
+        image = image.convert('L')
+        if not self._started:
+            # The header holds the global palette, which is the identity on the gray levels of the frames.
+            header, _ = GifImagePlugin.getheader(image.copy(), info={'loop': self.loop})
+            self._file.write(b''.join(header))
+            self._started = True
+        self._file.write(b''.join(GifImagePlugin.getdata(image, duration=self.duration)))
+
+    def close(self) -> None:
+        self._file.write(b';')
+        self._file.close()
+
+
+class _ApngWriter:
+    """
+    Writes frames into an animated PNG file one at a time. Every frame is encoded as a PNG image, whose image data is
+    then copied into the animation, so the number of frames must be known in advance.
+    """
+    def __init__(self, path: Path, nframes: int, duration: int, loop: int) -> None:
+        self._file = open(path, 'wb')
+        self.nframes = nframes
+        self.duration = duration
+        self.loop = loop
+        self._sequence = 0
+
+    def _write_chunk(self, kind: bytes, data: bytes) -> None:
+        self._file.write(struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data)))
+
+    def write(self, image: 'Image.Image') -> None:
+        encoded = io.BytesIO()
+        image.save(encoded, format='PNG')
+        png = encoded.getvalue()
+        chunks = []
+        offset = 8
+        while offset < len(png):
+            length, kind = struct.unpack('>I4s', png[offset:offset + 8])
+            chunks.append((kind, png[offset + 8:offset + 8 + length]))
+            offset += length + 12
+
+        first = self._sequence == 0
+        if first:
+            self._file.write(png[:8])
+            for kind, data in chunks:
+                if kind in (b'IHDR', b'PLTE', b'tRNS'):
+                    self._write_chunk(kind, data)
+            self._write_chunk(b'acTL', struct.pack('>II', self.nframes, self.loop))
+        self._write_chunk(b'fcTL', struct.pack('>IIIIIHHBB', self._sequence, image.width, image.height, 0, 0,
+                                               self.duration, 1000, 0, 0))
+        self._sequence += 1
+        data = b''.join(data for kind, data in chunks if kind == b'IDAT')
+        if first:
+            self._write_chunk(b'IDAT', data)
+        else:
+            self._write_chunk(b'fdAT', struct.pack('>I', self._sequence) + data)
+            self._sequence += 1
+
+    def close(self) -> None:
+        self._write_chunk(b'IEND', b'')
+        self._file.close()
+
+
+def _bounds(family: Callable[..., 'AffineIFS'],
+            parameter: Any,
+            tolerance: float | None) -> tuple[tuple[tuple[float, float], tuple[float, float]] | None, list[float]]:
+    """
+    Returns the bounds of the attractor of the family for the given parameter, or None if no tolerance is given, and the
+    probabilities of its maps. This runs in the worker processes.
+    """
+    ifs = family(parameter)
+    return ifs.bounds(tolerance) if tolerance is not None else None, ifs.probabilities.tolist()
+
+
+def _render(family: Callable[..., 'AffineIFS'],
+            parameter: Any,
+            length: int,
+            width: int,
+            seed: int,
+            weights: list[float],
+            viewport: tuple[tuple[float, float], tuple[float, float]],
+            bounds: tuple[tuple[float, float], tuple[float, float]],
+            options: dict[str, Any]) -> 'Image.Image':
+    """
+    Renders the frame of the family for the given parameter, choosing the maps with the given weights. The bounds
+    contain the attractors of all frames, so they are not calculated again. This runs in the worker processes.
+    """
+    ifs = family(parameter)
+    ifs.weights = weights
+    ifs.set_random_state(seed)
+    return ifs.make_image(length, width, viewport=viewport, bounds=bounds, **options)
+
+
+def render_animation(family: Callable[..., 'AffineIFS'],
+                     parameters: Sequence[Any],
+                     output: str | os.PathLike,
+                     length: int = 640,
+                     width: int = 480,
+                     seed: int = 0,
+                     duration: int = 40,
+                     loop: int = 0,
+                     processes: int | None = None,
+                     padding: float = 0.05,
+                     bounds_tolerance: float = 0.01,
+                     print_progress: bool = False,
+                     **options) -> None:
+    """
+    Renders an animation of a one-parameter family of IFS, such as cesaro_curve_ifs, koch_peano_curve_ifs or
+    takagi_curve_ifs, with one frame for every parameter along a path of parameters.
+
+    All frames share the same framing, the union of the bounds of the attractors of all frames with padding, so the
+    attractor does not jump around as its size changes. The bounds are calculated once for every frame up front and
+    are not calculated again while rendering. A viewport or bounds given in the options replace the shared framing or
+    the union of the bounds, respectively, for all frames. Every frame is rendered with the same random state, and
+    chooses its maps with the same probabilities, the average over all frames of the probabilities their IFS would
+    choose the maps with. Every frame then applies the same stream of random map choices to its own maps, which keeps
+    consecutive frames coherent instead of flickering with independent noise. Frames are rendered in parallel by a pool
+    of processes and written in order as soon as they are finished, so only a few frames are held in memory at a time.
+
+    :param family: A function returning the IFS for a parameter. It is sent to the worker processes, so it must be
+                   defined at the top level of a module. The IFS of all parameters must have the same number of maps.
+    :param parameters: The parameters of the frames, in order, for example numpy.linspace(0.3 + 0.3j, 0.7 + 0.3j, 60).
+    :param output: A .gif file, a .png or .apng file for an animated PNG, or otherwise a directory which every frame is
+                   written into as a PNG file named after its index.
+    :param length: Length of the frames, in pixels (default: 640).
+    :param width: Width of the frames, in pixels (default: 480).
+    :param seed: The random state every frame is rendered with (default: 0).
+    :param duration: The time every frame is shown for, in milliseconds (default: 40).
+    :param loop: The number of times the animation is played, or 0 to play it forever (default: 0).
+    :param processes: The number of worker processes, each rendering one frame at a time. If not given, the number of
+                      processors is used.
+    :param padding: The margin around the attractors on each side, as a proportion of the larger side of the union of
+                    their bounds (default: 0.05). Ignored if a viewport is given.
+    :param bounds_tolerance: The tolerance of the bounds of the attractors (see AffineIFS.bounds, default: 0.01).
+                             Ignored if bounds are given.
+    :param print_progress: If True, print every finished frame to the standard output (default: False).
+    :param options: Further keyword arguments to AffineIFS.make_image, such as batch_size, supersampling, or a
+                    viewport or bounds shared by all frames.
+    """
+    output = Path(output)
+    processes = processes or os.cpu_count() or 1
+    viewport = options.pop('viewport', None)
+    frame = options.pop('bounds', None)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        tolerance = bounds_tolerance if frame is None else None
+        bounds, probabilities = zip(*executor.map(_bounds, [family] * len(parameters), parameters,
+                                                  [tolerance] * len(parameters)))
+        if frame is None:
+            frame = ((min(x for (x, _), _ in bounds), max(x for (_, x), _ in bounds)),
+                     (min(y for _, (y, _) in bounds), max(y for _, (_, y) in bounds)))
+        if viewport is None:
+            (x_min, x_max), (y_min, y_max) = frame
+            margin = padding * max(x_max - x_min, y_max - y_min)
+            viewport = (x_min - margin, x_max + margin), (y_min - margin, y_max + margin)
+        weights = [sum(column) / len(parameters) for column in zip(*probabilities)]
+
+        # Animation files are written into a temporary file first, so an interrupted render never leaves a broken file.
+        partial = output.with_name(f'{output.name}.partial')
+        suffix = output.suffix.lower()
+        if suffix == '.gif':
+            writer = _GifWriter(partial, duration, loop)
+        elif suffix in ('.png', '.apng'):
+            writer = _ApngWriter(partial, len(parameters), duration, loop)
+        else:
+            writer = _FrameDirectory(output)
+
+        try:
+            # Only a few more frames than processes are rendered ahead, so finished frames never pile up in memory while
+            # an earlier frame is still being rendered.
+            remaining = iter(parameters)
+            futures = deque(executor.submit(_render, family, parameter, length, width, seed, weights, viewport, frame,
+                                            options)
+                            for parameter in itertools.islice(remaining, 2 * processes))
+            for index in range(len(parameters)):
+                writer.write(futures.popleft().result())
+                for parameter in itertools.islice(remaining, 1):
+                    futures.append(executor.submit(_render, family, parameter, length, width, seed, weights, viewport,
+                                                   frame, options))
+                if print_progress:
+                    print(f'Rendered frame {index + 1} of {len(parameters)}', flush=True)
+        finally:
+            writer.close()
+        if not isinstance(writer, _FrameDirectory):
+            partial.replace(output)
@@ -0,0 +1,160 @@
+"""Rendering any number of curves of the cookbook into image files, headlessly and with a pool of processes."""
+
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import fnmatch
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+from typing import Any, TYPE_CHECKING
+
+from fractals.ifs import cookbook
+
+if TYPE_CHECKING:
+    from fractals.ifs.affine import AffineIFS
+
+
+__all__ = ['render_gallery', 'cache_key', 'main']
+
+
+# Changing this invalidates all cached images, for example after a change to the rendering itself.
+_CACHE_VERSION = 2
+
+
+def _select(patterns: list[str] | None) -> list[str]:
+    """Returns the names of the cookbook curves matching any of the given shell-style patterns, in cookbook order."""
+    if not patterns:
+        return list(cookbook.__all__)
+    names = [name for name in cookbook.__all__ if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+    if unmatched := [pattern for pattern in patterns
+                     if not any(fnmatch.fnmatchcase(name, pattern) for name in cookbook.__all__)]:
+        raise ValueError(f'No curves in the cookbook match {", ".join(unmatched)}')
+    return names
+
+
+def cache_key(ifs: 'AffineIFS', length: int, width: int, seed: int, file_format: str, options: dict[str, Any]) -> str:
+    """
+    Returns the key of the cached image of a curve. The key is derived from the maps of the curve, their
+    probabilities, its number of walkers and its precision, not its name, so changing the parameters of a curve
+    invalidates its cached image and renaming it does not.
+    :param ifs: The IFS of the curve.
+    :param length: Length of the image, in pixels.
+    :param width: Width of the image, in pixels.
+    :param seed: The random state the curve is rendered with.
+    :param file_format: The file extension of the image.
+    :param options: Further keyword arguments to AffineIFS.make_image.
+    :return: A hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(ifs.maps.astype('<f8').tobytes())
+    digest.update(json.dumps(ifs.probabilities.tolist()).encode())
+    digest.update(json.dumps([_CACHE_VERSION, ifs.walkers, ifs.precision, length, width, seed, file_format, options],
+                             sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _render(ifs: 'AffineIFS', length: int, width: int, seed: int, options: dict[str, Any], target: Path) -> None:
+    """
+    Renders one curve into the given file. The IFS is sent from the main process, so the image is rendered from the
+    same IFS its cache key was derived from. This runs in the worker processes.
+    """
+    ifs.set_random_state(seed)
+    ifs.make_image(length, width, **options).save(target)
+
+
+def render_gallery(output: str | os.PathLike,
+                   names: list[str] | None = None,
+                   length: int = 1920,
+                   width: int = 1080,
+                   seed: int = 0,
+                   file_format: str = 'png',
+                   processes: int | None = None,
+                   cache: str | os.PathLike | None = None,
+                   print_progress: bool = False,
+                   **options) -> dict[str, Path]:
+    """
+    Renders curves of the cookbook into image files named after the curves.
+
+    Every image is cached under a key derived from the matrices of the curve and its settings, the size of the image,
+    the seed and the render options (see cache_key). Images which are already in the cache are copied from it instead
+    of being rendered again, so rendering the gallery again only renders the curves whose parameters or options
+    changed.
+
+    :param output: The directory to write the images into. It is created if it does not exist.
+    :param names: Names of the curves to render; shell-style patterns such as 'vepstas_gallery1*' are allowed. If not
+                  given, all curves of the cookbook are rendered.
+    :param length: Length of the images, in pixels (default: 1920).
+    :param width: Width of the images, in pixels (default: 1080).
+    :param seed: The random state every curve is rendered with (default: 0).
+    :param file_format: The file extension of the images, which determines their format (default: 'png').
+    :param processes: The number of worker processes, each rendering one curve at a time. If not given, the number of
+                      processors is used.
+    :param cache: The directory holding the cached images (default: a directory named .cache in the output directory).
+    :param print_progress: If True, print every finished curve to the standard output (default: False).
+    :param options: Further keyword arguments to AffineIFS.make_image, such as batch_size or supersampling.
+    :return: The written image file of every curve, by name.
+    """
+    output = Path(output)
+    cache = Path(cache) if cache is not None else output / '.cache'
+    output.mkdir(parents=True, exist_ok=True)
+    cache.mkdir(parents=True, exist_ok=True)
+
+    curves = {name: getattr(cookbook, name) for name in _select(names)}
+    targets = {name: output / f'{name}.{file_format}' for name in curves}
+    cached = {name: cache / f'{cache_key(ifs, length, width, seed, file_format, options)}.{file_format}'
+              for name, ifs in curves.items()}
+    missing = [name for name in targets if not cached[name].exists()]
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # Images are rendered into a temporary file first, so interrupted renders never end up in the cache.
+        futures = {executor.submit(_render, curves[name], length, width, seed, options,
+                                   cached[name].with_suffix(f'.partial.{file_format}')): name for name in missing}
+        for future in futures:
+            name = futures[future]
+            future.result()
+            cached[name].with_suffix(f'.partial.{file_format}').replace(cached[name])
+            if print_progress:
+                print(f'Rendered {name}', flush=True)
+
+    for name, target in targets.items():
+        shutil.copyfile(cached[name], target)
+        if print_progress and name not in missing:
+            print(f'Cached {name}', flush=True)
+    return targets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m fractals.ifs.gallery',
+                                     description='Render curves of the cookbook into image files.')
+    parser.add_argument('output', nargs='?', help='the directory to write the images into')
+    parser.add_argument('names', nargs='*', help='names or shell-style patterns of the curves (default: all curves)')
+    parser.add_argument('--size', nargs=2, type=int, default=(1920, 1080), metavar=('LENGTH', 'WIDTH'),
+                        help='size of the images in pixels (default: 1920 1080)')
+    parser.add_argument('--seed', type=int, default=0, help='random state of every curve (default: 0)')
+    parser.add_argument('--format', default='png', dest='file_format', help='file extension of the images')
+    parser.add_argument('--processes', type=int, help='number of worker processes (default: number of processors)')
+    parser.add_argument('--cache', help='directory of the cached images (default: OUTPUT/.cache)')
+    parser.add_argument('--batch-size', type=int, default=10000, help='points per batch (default: 10000)')
+    parser.add_argument('--cutoff', type=float, default=0.99, dest='completeness_cutoff',
+                        help='completeness cutoff (default: 0.99)')
+    parser.add_argument('--theme', choices=('dark', 'light'), default='dark', dest='color_theme')
+    parser.add_argument('--method', choices=('chaos', 'addresses'), default='chaos')
+    parser.add_argument('--supersampling', type=int, default=1)
+    parser.add_argument('--kernel', choices=('box', 'tent'), default='box')
+    parser.add_argument('--list', action='store_true', help='list the curves of the cookbook and exit')
+    arguments = vars(parser.parse_args())
+
+    if arguments.pop('list'):
+        print('\n'.join(cookbook.__all__))
+        return
+    if arguments['output'] is None:
+        parser.error('the output directory is required')
+    length, width = arguments.pop('size')
+    render_gallery(length=length, width=width, print_progress=True, **arguments)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Instrumentation of renders of iterated function systems: where their time goes and how they converge."""
+
+
+from collections.abc import Callable, Generator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+import json
+import os
+import time
+from typing import Any
+
+
+__all__ = ['RenderMetrics']
+
+
+class RenderMetrics:
+    """
+    Metrics of a render, collected while it runs when given to AffineIFS.make_image, render_tiled or
+    accumulate_density:
+
+    - phases: the time spent in each phase of the render, in seconds. The phases are 'bounds' (finding the bounds of the
+      attractor), 'prefixes' (finding the pieces visible in a viewport), 'generation' (generating points, with the chaos
+      game or by enumerating addresses), 'scaling' (mapping points to pixel coordinates), 'rasterization' (drawing
+      pixels and counting the filled ones), 'merging' (merging the pixels of worker processes) and 'encoding'
+      (converting the canvas into an image, or flushing a tiled canvas). With several processes, the time of the phases
+      running in the workers is summed over all of them, so the phases can add up to more than the elapsed time.
+    - the number of points and batches rendered, and the points generated per second of generation time.
+    - the completeness curve: after every batch, the number of points rendered so far and the completeness of the batch,
+      the proportion of its points which fell into already filled pixels. Enumerated points have no completeness.
+    - the peak sizes of the buffers of the render in bytes: 'points' (a batch of points), 'pixel_coordinates' (their
+      pixel coordinates), 'canvas' (the pixel values) and 'retained_points' (points kept in the IFS).
+
+    This is what batch_size and completeness_cutoff are tuned from: how much time is spent per point outside of point
+    generation, and how many batches go into the last percent of completeness.
+    """
+    PHASES = ('bounds', 'prefixes', 'generation', 'scaling', 'rasterization', 'merging', 'encoding')
+
+    def __init__(self, callback: Callable[['RenderMetrics'], None] | None = None) -> None:
+        """
+        Initializes new, empty render metrics. Metrics given to several renders add up.
+        :param callback: A function called with the metrics after every batch and once more when the render is done,
+                         for example to plot the completeness curve while the render goes on.
+        """
+        self.callback = callback
+        self.phases = dict.fromkeys(self.PHASES, 0.0)
+        self.npoints = 0
+        self.nbatches = 0
+        self.completeness: list[tuple[int, float | None]] = []
+        self.buffers: dict[str, int] = {}
+        self.settings: dict[str, Any] = {}
+        self.elapsed = 0.0
+        self.done = False
+        self._start: float | None = None
+
+    @property
+    def points_per_second(self) -> float:
+        """The number of points generated per second of generation time."""
+        return self.npoints / self.phases['generation'] if self.phases['generation'] > 0 else 0.0
+
+    def start(self, **settings) -> None:
+        """Starts the clock of a render with the given settings, such as its batch size, kept for reference."""
+        self.settings.update(settings)
+        self.done = False
+        self._start = time.perf_counter()
+
+    def finish(self) -> None:
+        """Stops the clock of the render and calls the callback a last time."""
+        if self._start is not None:
+            self.elapsed += time.perf_counter() - self._start
+            self._start = None
+        self.done = True
+        if self.callback is not None:
+            self.callback(self)
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        """Adds the time spent in the body of the with statement to the given phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Adds time to the given phase."""
+        if name not in self.phases:
+            raise ValueError(f'Unknown render phase: {name!r}')
+        self.phases[name] += seconds
+
+    def add_buffer(self, name: str, nbytes: int) -> None:
+        """Records the size of a buffer, keeping the largest size seen for each buffer."""
+        self.buffers[name] = max(self.buffers.get(name, 0), int(nbytes))
+
+    def add_batch(self, npoints: int, completeness: float | None) -> None:
+        """Records a rendered batch of points and its completeness, and calls the callback."""
+        self.npoints += npoints
+        self.nbatches += 1
+        self.completeness.append((self.npoints, completeness))
+        if self.callback is not None:
+            self.callback(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the metrics as a dictionary which can be saved as JSON."""
+        return {
+            'settings': self.settings,
+            'elapsed': self.elapsed,
+            'phases': self.phases,
+            'npoints': self.npoints,
+            'nbatches': self.nbatches,
+            'points_per_second': self.points_per_second,
+            'completeness': [{'npoints': npoints, 'completeness': completeness}
+                             for npoints, completeness in self.completeness],
+            'buffers': self.buffers,
+        }
+
+    def save(self, path: str | os.PathLike) -> None:
+        """
+        Saves the metrics to a JSON file.
+        :param path: The file to save the metrics to.
+        """
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def summary(self) -> str:
+        """Returns a short, human-readable summary of the metrics."""
+        phases = ', '.join(f'{name} {seconds:.3f} s' for name, seconds in self.phases.items() if seconds > 0)
+        last = self.completeness[-1][1] if self.completeness else None
+        return (f'{self.npoints} points in {self.nbatches} batches, {self.elapsed:.3f} s ({phases}), '
+                f'{self.points_per_second:.4g} points/s'
+                + (f', final completeness {last:.4f}' if last is not None else ''))
+
+
+def _phase(metrics: RenderMetrics | None, name: str) -> AbstractContextManager:
+    """Times the body of a with statement as the given phase if metrics are given, and does nothing otherwise."""
+    return metrics.phase(name) if metrics is not None else nullcontext()
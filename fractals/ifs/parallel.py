@@ -0,0 +1,185 @@
+"""Rendering a single image of an iterated function system with a pool of processes."""
+
+
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import multiprocessing
+import time
+import numpy as np
+from typing import TYPE_CHECKING
+
+from fractals.ifs.metrics import RenderMetrics, _phase
+from fractals.ifs.render import Canvas, _ProgressPrinter
+
+if TYPE_CHECKING:
+    from fractals.ifs.affine import AffineIFS, _Prefixes
+
+
+__all__ = ['render_parallel']
+
+
+# The smallest number of points every process renders per round. Each round costs two round trips to the workers and a
+# merge of the rows they touched, so rounds of a few thousand points spend far more time synchronizing than rendering.
+_ROUND_POINTS = 1 << 18
+
+# The state of a worker process, set once by _init_worker: the pixel arrays shared with all processes, the index of the
+# worker, its copy of the IFS, which keeps advancing from round to round, and the canvas settings to render with.
+_shared_data: np.ndarray | None = None
+_worker_data: list[np.ndarray] = []
+_touched: np.ndarray | None = None
+_index = 0
+_ifs: 'AffineIFS | None' = None
+_canvas: Canvas | None = None
+_prefixes: '_Prefixes | None' = None
+
+
+def _shared_array(raw, dtype: np.dtype, shape: tuple[int, ...]) -> np.ndarray:
+    return np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+
+def _init_worker(shared_raw,
+                 worker_raws: list,
+                 touched_raw,
+                 dtype: np.dtype,
+                 shape: tuple[int, int],
+                 index: int,
+                 ifs: 'AffineIFS',
+                 canvas: Canvas,
+                 prefixes: '_Prefixes | None') -> None:
+    global _shared_data, _worker_data, _touched, _index, _ifs, _canvas, _prefixes
+    _shared_data = _shared_array(shared_raw, dtype, shape)
+    _worker_data = [_shared_array(raw, dtype, shape) for raw in worker_raws]
+    _touched = _shared_array(touched_raw, np.bool_, (len(worker_raws), shape[0]))
+    _index, _ifs, _canvas, _prefixes = index, ifs, canvas, prefixes
+
+
+def _render_round(npoints: int, batch_size: int) -> tuple[int, int, tuple[float, float, float]]:
+    """
+    Renders npoints points of the IFS of this worker into its pixel array, batch_size points at a time, and marks the
+    rows they fall into as touched. Completeness is checked against the shared pixel array, which is not modified during
+    a round, so the result does not depend on timing. Returns the number of points already filled besides the number of
+    points rendered, since points outside a viewport are dropped, and the time spent generating, scaling and
+    rasterizing them.
+    """
+    shared = _canvas.with_data(_shared_data)
+    own = _canvas.with_data(_worker_data[_index])
+    filled = rendered = 0
+    times = np.zeros(3)
+    for offset in range(0, npoints, batch_size):
+        start = time.perf_counter()
+        points = _ifs._advance(min(batch_size, npoints - offset))
+        if _prefixes is not None:
+            points = _prefixes.apply(_ifs._rng, points)
+        generated = time.perf_counter()
+        x_coords, y_coords = _canvas.pixel_coordinates(points)
+        scaled = time.perf_counter()
+        filled += shared.count_filled(x_coords, y_coords)
+        own.draw(x_coords, y_coords)
+        _touched[_index, _canvas.data_rows(y_coords)] = True
+        rendered += len(points)
+        times += generated - start, scaled - generated, time.perf_counter() - scaled
+    return filled, rendered, tuple(times)
+
+
+def _reduce_rows(rows: slice) -> None:
+    """
+    Merges the touched part of the given rows of all worker pixel arrays into the shared pixel array and clears it. The
+    rows from the first to the last touched one are merged as a single slice.
+    """
+    for data, touched in zip(_worker_data, _touched):
+        indices = np.flatnonzero(touched[rows])
+        if len(indices) == 0:
+            continue
+        span = slice(rows.start + indices[0], rows.start + indices[-1] + 1)
+        _canvas.merge_data(_shared_data[span], data[span])
+        data[span] = _canvas.background
+        touched[span] = False
+
+
+def render_parallel(ifs: 'AffineIFS',
+                    canvas: Canvas,
+                    processes: int,
+                    batch_size: int = 100000,
+                    completeness_cutoff: float = 0.99,
+                    npoints: int | None = None,
+                    print_progress: bool = False,
+                    prefixes: '_Prefixes | None' = None,
+                    metrics: RenderMetrics | None = None) -> None:
+    """
+    Renders points of the given IFS into the canvas with a pool of processes.
+
+    Every process keeps its own copy of the IFS, advanced with an independent random stream spawned from the random
+    state of the IFS, and draws into its own pixel array in shared memory. Each copy is sent once, to a process of its
+    own, and stays there for the whole render. Work proceeds in rounds: in each round every process renders at least
+    _ROUND_POINTS points, checking completeness against the canvas as it was at the end of the previous round, after
+    which the processes merge the rows touched in their pixel arrays into the canvas stripe by stripe. For a given
+    random state and number of processes the result is therefore identical from run to run.
+
+    :param ifs: The IFS to render.
+    :param canvas: The canvas to render into.
+    :param processes: The number of worker processes.
+    :param batch_size: The number of points each process generates at a time (default: 100000). Every process renders
+                       the larger of batch_size and _ROUND_POINTS points per round.
+    :param completeness_cutoff: The proportion of the points of a round that need to already be filled by a previous
+                                round before point generation stops. (default: 0.99).
+    :param npoints: The total number of points to render. If given, the completeness cutoff is ignored.
+    :param print_progress: If True, print progress to the standard output (default: False).
+    :param prefixes: The pieces of the IFS visible in a viewport, which points are mapped onto (see the viewport of
+                     AffineIFS.make_image). If not given, points of the whole attractor are rendered.
+    :param metrics: If given, every round is recorded into these metrics as one batch. The time spent in the workers is
+                    summed over all of them.
+    """
+    context = multiprocessing.get_context()
+    dtype, shape = canvas.data.dtype, canvas.data.shape
+    ctype = np.ctypeslib.as_ctypes_type(dtype)
+    shared_raw = context.RawArray(ctype, canvas.data.size)
+    worker_raws = [context.RawArray(ctype, canvas.data.size) for _ in range(processes)]
+    touched_raw = context.RawArray(np.ctypeslib.as_ctypes_type(np.bool_), processes * canvas.width)
+    shared_data = _shared_array(shared_raw, dtype, shape)
+    shared_data[...] = canvas.data
+    for raw in worker_raws:
+        _shared_array(raw, dtype, shape)[...] = canvas.background
+
+    # Pixel arrays are attached in the workers, so only the settings of the canvas are sent along with the IFS copies.
+    template = canvas.with_data(np.empty(shape=(0, 0), dtype=dtype))
+    round_size = max(batch_size, _ROUND_POINTS)
+    quotas = [npoints // processes + (index < npoints % processes) for index in range(processes)] \
+        if npoints is not None else [None] * processes
+    edges = np.linspace(0, canvas.width, processes + 1, dtype=int)
+    stripes = [slice(lower, upper) for lower, upper in zip(edges, edges[1:])]
+    progress = _ProgressPrinter(completeness_cutoff, print_progress)
+    if metrics is not None:
+        metrics.add_buffer('canvas', canvas.data.nbytes * (processes + 1))
+
+    with contextlib.ExitStack() as stack:
+        # One single-process pool per worker, so that every round of a worker runs in the process holding its IFS.
+        executors = [stack.enter_context(ProcessPoolExecutor(
+            max_workers=1, mp_context=context, initializer=_init_worker,
+            initargs=(shared_raw, worker_raws, touched_raw, dtype, shape, index, worker, template, prefixes)))
+            for index, worker in enumerate(ifs.spawn(processes))]
+        while True:
+            sizes = [round_size if quota is None else min(round_size, quota) for quota in quotas]
+            futures = [executor.submit(_render_round, size, batch_size) for executor, size in zip(executors, sizes)]
+            results = [future.result() for future in futures]
+            rendered = sum(rendered for _, rendered, _ in results)
+            completeness = sum(filled for filled, _, _ in results) / max(rendered, 1)
+            with _phase(metrics, 'merging'):
+                futures = [executor.submit(_reduce_rows, stripe) for executor, stripe in zip(executors, stripes)]
+                for future in futures:
+                    future.result()
+            if metrics is not None:
+                worker_times = zip(*(times for _, _, times in results))
+                for phase, seconds in zip(('generation', 'scaling', 'rasterization'), worker_times):
+                    metrics.add_time(phase, sum(seconds))
+                metrics.add_batch(rendered, completeness)
+
+            if npoints is not None:
+                quotas = [quota - size for quota, size in zip(quotas, sizes)]
+                if not any(quotas):
+                    break
+            elif completeness >= completeness_cutoff:
+                break
+            progress.update(completeness)
+    progress.done()
+
+    canvas.data[...] = shared_data
@@ -0,0 +1,116 @@
+"""The state of a progressive render of an iterated function system, which can be saved and resumed."""
+
+
+import json
+import os
+from pathlib import Path
+import numpy as np
+import numpy.typing as npt
+from typing import Any
+
+from fractals.ifs import render
+from fractals.ifs.render import Canvas, TiledCanvas
+
+
+__all__ = ['RenderState']
+
+
+class RenderState:
+    """
+    The state of a progressive render (see AffineIFS.render_progressive): the canvas being rendered into, the state of
+    the IFS rendering it, which is its random state and the positions of its walkers, and statistics of the render so
+    far.
+
+    The state can be saved to a file and loaded again, also in another process, so that an interrupted render resumes
+    where it was last saved instead of starting over. The resumed render generates exactly the points that the
+    interrupted render would have generated next.
+    """
+    def __init__(self,
+                 canvas: Canvas,
+                 maps: npt.NDArray[np.float64],
+                 random_state: dict[str, Any] | None = None,
+                 positions: npt.NDArray[np.float64] | None = None,
+                 pending: npt.NDArray[np.float64] | None = None,
+                 npoints: int = 0,
+                 nbatches: int = 0,
+                 elapsed: float = 0.0,
+                 completeness: float = 0.0,
+                 points_per_second: float = 0.0) -> None:
+        """
+        Initializes a new render state.
+        :param canvas: The canvas being rendered into.
+        :param maps: The maps of the IFS being rendered, which a resumed render is checked against.
+        :param random_state: The state of the bit generator of the IFS (numpy.random.BitGenerator.state). If not given,
+                             the render has not started yet.
+        :param positions: The positions of the walkers of the IFS, in homogeneous coordinates, or as (x, y) rows for an
+                          IFS in single precision.
+        :param pending: Points which the walkers already generated but which were not rendered yet.
+        :param npoints: The number of points rendered so far.
+        :param nbatches: The number of batches rendered so far.
+        :param elapsed: The time spent rendering so far, in seconds, not counting the time between batches.
+        :param completeness: The proportion of points of the last batch which fell into already filled pixels.
+        :param points_per_second: The number of points rendered per second since the last state was yielded.
+        """
+        self.canvas = canvas
+        self.maps = maps
+        self.random_state = random_state
+        self.positions = positions
+        self.pending = pending
+        self.npoints = npoints
+        self.nbatches = nbatches
+        self.elapsed = elapsed
+        self.completeness = completeness
+        self.points_per_second = points_per_second
+        self.done = False
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> 'RenderState':
+        """
+        Loads a render state saved with RenderState.save.
+        :param path: The file to load the state from.
+        :return: The loaded render state.
+        """
+        with np.load(path) as data:
+            metadata = json.loads(str(data['metadata']))
+            kind = getattr(render, metadata['canvas'], None)
+            if not (isinstance(kind, type) and issubclass(kind, Canvas)):
+                raise ValueError(f'Unknown canvas type: {metadata["canvas"]!r}')
+            canvas = kind(metadata['length'], metadata['width'], tuple(metadata['x_bounds']),
+                          tuple(metadata['y_bounds']), **metadata['settings'])
+            if data['pixels'].size:
+                canvas.data[...] = data['pixels']
+            return cls(canvas, data['maps'], metadata['random_state'], data['positions'], data['pending'],
+                       **metadata['statistics'])
+
+    def save(self, path: str | os.PathLike) -> None:
+        """
+        Saves the render state to a .npz file. The file is replaced in a single step, so a save which is interrupted
+        leaves the previously saved state intact. The pixels of a tiled canvas stay in its own file, which is flushed.
+        :param path: The file to save the state to.
+        """
+        if self.random_state is None:
+            raise ValueError('Only a render which has started can be saved')
+        if isinstance(self.canvas, TiledCanvas):
+            self.canvas.flush()
+            pixels = np.empty(shape=0, dtype=np.uint8)
+        else:
+            pixels = self.canvas.data
+        metadata = {
+            'canvas': type(self.canvas).__name__,
+            'length': self.canvas.length,
+            'width': self.canvas.width,
+            'x_bounds': self.canvas.x_bounds,
+            'y_bounds': self.canvas.y_bounds,
+            'settings': self.canvas.settings(),
+            'random_state': self.random_state,
+            'statistics': {'npoints': self.npoints, 'nbatches': self.nbatches, 'elapsed': self.elapsed,
+                           'completeness': self.completeness, 'points_per_second': self.points_per_second},
+        }
+
+        path = Path(path)
+        partial = path.with_name(f'{path.name}.partial')
+        with open(partial, 'wb') as file:
+            # Bit generators other than the default PCG64 hold arrays in their state, which are saved as lists.
+            np.savez(file, maps=self.maps, positions=self.positions, pending=self.pending, pixels=pixels,
+                     metadata=np.array(json.dumps(metadata, default=lambda value: np.asarray(value).tolist())))
+        os.replace(partial, path)
@@ -0,0 +1,678 @@
+"""Per-pixel buffers that points of an iterated function system are rendered into."""
+
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+import copy
+import os
+from pathlib import Path
+import time
+import numpy as np
+import numpy.typing as npt
+from typing import Any, Literal, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from fractals.ifs.metrics import RenderMetrics
+
+
+__all__ = ['Canvas', 'BinaryCanvas', 'SupersampledCanvas', 'TiledCanvas', 'DensityBuffer']
+
+
+type Colormap = Callable[[npt.NDArray[np.float64]], npt.NDArray[np.float64]]
+
+
+def _scale(array: np.ndarray, bottom: float, top: float, bounds: tuple[float, float] | None = None) -> np.ndarray:
+    if bounds is None:
+        bounds = array.min(), array.max()
+    return np.interp(array, bounds, (bottom, top))
+
+
+def _pixel_indices(values: np.ndarray, npixels: int, bounds: tuple[float, float]) -> npt.NDArray[np.intp]:
+    """
+    Returns the indices of the pixels, of which there are npixels between the bounds, that the values fall into. Values
+    outside the bounds are clamped to the border pixels. Single precision values are scaled in single precision, so
+    compact points are never widened to double precision.
+    """
+    if values.dtype != np.float32:
+        return np.floor(_scale(values, 0, npixels - 1, bounds)).astype(np.intp)
+    scaled = (values - np.float32(bounds[0])) * np.float32((npixels - 1) / (bounds[1] - bounds[0]))
+    np.clip(scaled, 0, npixels - 1, out=scaled)
+    # Truncation rounds down, since the scaled values are not negative.
+    return scaled.astype(np.intp)
+
+
+def _gray(values: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return np.repeat(values[..., np.newaxis], 3, axis=-1)
+
+
+def _get_colormap(colormap: str | Colormap | None) -> Colormap:
+    """Returns the colormap function for the given colormap name or function."""
+    if colormap is None or colormap == 'gray':
+        return _gray
+    if callable(colormap):
+        return colormap
+    from matplotlib import colormaps  # Only needed for named colormaps, and slow to import
+    return colormaps[colormap]
+
+
+def _to_image(pixels: np.ndarray) -> 'Image.Image':
+    """Converts an array of pixel values into an image."""
+    from PIL import Image  # Slow to import, and only needed once an image is made
+    return Image.fromarray(pixels)
+
+
+def _kernel_weights(kernel: str, factor: int) -> list[tuple[int, float]]:
+    """
+    Returns the weights of the subpixels for downscaling by the given factor with the given kernel, as pairs of an
+    offset from the first subpixel of a pixel and a weight. The weights sum up to 1.
+    """
+    center = (factor - 1) / 2
+    match kernel:
+        case 'box':
+            weights = [(offset, 1.0) for offset in range(factor)]
+        case 'tent':
+            weights = [(offset, 1 - abs(offset - center) / factor) for offset in range(-factor, 2 * factor)]
+            weights = [(offset, weight) for offset, weight in weights if weight > 0]
+        case _:
+            raise ValueError(f'Unknown kernel: {kernel!r}')
+    total = sum(weight for _, weight in weights)
+    return [(offset, weight / total) for offset, weight in weights]
+
+
+def _downscale(subpixels: npt.NDArray[np.float64],
+               count: int,
+               factor: int,
+               weights: list[tuple[int, float]]) -> npt.NDArray[np.float64]:
+    """
+    Downscales the rows of the subpixels by the given factor. The subpixels must start with factor rows of padding
+    before the first row of subpixels of the first pixel.
+    """
+    return sum(weight * subpixels[factor + offset::factor][:count] for offset, weight in weights)
+
+
+class _ProgressPrinter:
+    """Prints the completeness of a render to the standard output in steps of 10%, and 1% close to the cutoff."""
+    def __init__(self, completeness_cutoff: float, enabled: bool) -> None:
+        self.completeness_cutoff = completeness_cutoff
+        self.enabled = enabled
+        if enabled:
+            self.last_threshold = 10
+            print('...', end='', flush=True)
+        else:
+            self.last_threshold = 100
+
+    def update(self, completeness: float) -> None:
+        if self.enabled and completeness >= self.last_threshold / 100:
+            print(f'{self.last_threshold}%...', end='', flush=True)
+            if self.last_threshold >= int(100 * self.completeness_cutoff) - 10:
+                self.last_threshold += 1
+            else:
+                self.last_threshold += 10
+
+    def done(self) -> None:
+        if self.enabled:
+            print('done', flush=True)
+
+
+class Canvas(ABC):
+    """
+    A buffer of pixels that points are rendered into. The canvas maps the points inside its bounds linearly onto its
+    pixels; points outside the bounds are clamped to the border pixels. Subclasses define how points are drawn into the
+    pixels, how pixel arrays are merged and how the canvas is converted into an image.
+
+    The pixel values are held in the data array of shape (width, length), with row 0 at the bottom of the canvas. A
+    pixel is filled if its value differs from the background value.
+    """
+    background = 0
+
+    def __init__(self,
+                 length: int,
+                 width: int,
+                 x_bounds: tuple[float, float],
+                 y_bounds: tuple[float, float],
+                 data: np.ndarray) -> None:
+        """
+        Initializes a new canvas.
+        :param length: Length of the canvas, in pixels.
+        :param width: Width of the canvas, in pixels.
+        :param x_bounds: The x coordinates of the left and right edges of the canvas.
+        :param y_bounds: The y coordinates of the bottom and top edges of the canvas.
+        :param data: The array holding the pixel values, of shape (width, length).
+        """
+        if data.shape != self._data_shape(length, width):
+            raise ValueError(f'Pixel data of shape {data.shape} does not match a canvas of shape {(width, length)}')
+        self.length = length
+        self.width = width
+        self.x_bounds = tuple(x_bounds)
+        self.y_bounds = tuple(y_bounds)
+        self.data = data
+
+    @property
+    def pixel_size(self) -> tuple[float, float]:
+        """The size of a pixel in the x and y directions."""
+        return ((self.x_bounds[1] - self.x_bounds[0]) / (self.length - 1),
+                (self.y_bounds[1] - self.y_bounds[0]) / (self.width - 1))
+
+    def _data_shape(self, length: int, width: int) -> tuple[int, ...]:
+        """Returns the shape of the array holding the pixel values of a canvas with the given size."""
+        return width, length
+
+    def settings(self) -> dict[str, Any]:
+        """
+        Returns the keyword arguments which create an empty canvas like this one, besides its size and bounds. Together
+        with the pixel values, they let a canvas be saved and recreated, for example to resume a render.
+        """
+        return {}
+
+    def with_data(self, data: np.ndarray) -> 'Canvas':
+        """
+        Returns a canvas with the same shape, bounds and settings as this one, but holding its pixel values in the given
+        array. This is used to render into arrays that live in shared memory.
+        """
+        canvas = copy.copy(self)
+        canvas.data = data
+        return canvas
+
+    def pixel_coordinates(self,
+                          points: npt.NDArray[np.float64]) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+        """
+        Calculates the pixels the given points fall into.
+        :param points: The points, one (x, y) row per point.
+        :return: The column and row indices of the pixels, with row 0 at the bottom of the canvas.
+        """
+        x_coords = _pixel_indices(points[:, 0], self.length, self.x_bounds)
+        y_coords = _pixel_indices(points[:, 1], self.width, self.y_bounds)
+        return x_coords, y_coords
+
+    def data_rows(self, y_coords: npt.NDArray[np.intp]) -> npt.NDArray[np.intp]:
+        """Returns the rows of the data array which the pixels with the given row indices are drawn into."""
+        return y_coords
+
+    def count_filled(self, x_coords: npt.NDArray[np.intp], y_coords: npt.NDArray[np.intp]) -> int:
+        """Counts how many of the given pixels are already filled."""
+        return np.count_nonzero(self.data[y_coords, x_coords] != self.background)
+
+    @abstractmethod
+    def draw(self, x_coords: npt.NDArray[np.intp], y_coords: npt.NDArray[np.intp]) -> None:
+        """Draws one point into each of the given pixels."""
+
+    @abstractmethod
+    def merge_data(self, target: np.ndarray, source: np.ndarray) -> None:
+        """
+        Merges pixel values drawn into the source array into the target array. Both arrays may be matching slices of
+        full pixel arrays.
+        """
+
+    def add(self, points: npt.NDArray[np.float64], metrics: 'RenderMetrics | None' = None) -> int:
+        """
+        Renders the given points into the canvas.
+        :param points: The points, one (x, y) row per point.
+        :param metrics: If given, the time spent scaling and rasterizing the points and the size of their pixel
+                        coordinates are recorded into these metrics.
+        :return: The number of points that fell into pixels which were already filled before this call.
+        """
+        start = time.perf_counter()
+        x_coords, y_coords = self.pixel_coordinates(points)
+        scaled = time.perf_counter()
+        filled = self.count_filled(x_coords, y_coords)
+        self.draw(x_coords, y_coords)
+        if metrics is not None:
+            metrics.add_time('scaling', scaled - start)
+            metrics.add_time('rasterization', time.perf_counter() - scaled)
+            metrics.add_buffer('pixel_coordinates', x_coords.nbytes + y_coords.nbytes)
+        return filled
+
+    @abstractmethod
+    def to_image(self) -> 'Image.Image':
+        """Converts the canvas into an image."""
+
+
+class BinaryCanvas(Canvas):
+    """A canvas whose pixels are either on or off."""
+    def __init__(self,
+                 length: int,
+                 width: int,
+                 x_bounds: tuple[float, float],
+                 y_bounds: tuple[float, float],
+                 color_theme: Literal['dark'] | Literal['light'] = 'dark') -> None:
+        """
+        Initializes a new binary canvas.
+        :param length: Length of the canvas, in pixels.
+        :param width: Width of the canvas, in pixels.
+        :param x_bounds: The x coordinates of the left and right edges of the canvas.
+        :param y_bounds: The y coordinates of the bottom and top edges of the canvas.
+        :param color_theme: Whether to use a dark or light background for the image (default: 'dark').
+        """
+        self.color_theme = color_theme
+        self.background = self.off = 0 if color_theme == 'dark' else 255
+        self.on = 255 if color_theme == 'dark' else 0
+        super().__init__(length, width, x_bounds, y_bounds,
+                         np.full(shape=(width, length), fill_value=self.off, dtype=np.uint8))
+
+    def settings(self) -> dict[str, Any]:
+        return {'color_theme': self.color_theme}
+
+    @property
+    def image(self) -> npt.NDArray[np.uint8]:
+        """The pixel values of the canvas."""
+        return self.data
+
+    def draw(self, x_coords: npt.NDArray[np.intp], y_coords: npt.NDArray[np.intp]) -> None:
+        self.data[y_coords, x_coords] = self.on
+
+    def merge_data(self, target: np.ndarray, source: np.ndarray) -> None:
+        np.copyto(target, self.on, where=source == self.on)
+
+    def to_image(self) -> 'Image.Image':
+        return _to_image(np.flipud(self.image))
+
+
+class SupersampledCanvas(Canvas):
+    """
+    A canvas whose pixels are divided into supersampling x supersampling subpixels which are either on or off. It
+    renders points exactly like a binary canvas that many times larger, but stores the subpixels of each pixel as the
+    bits of a single integer, so memory use stays proportional to the size of the canvas. When the canvas is converted
+    into an image, the subpixels are filtered down to the pixels with a box or tent kernel, which gives the same
+    anti-aliased image as rendering the larger binary canvas and downscaling it.
+    """
+    background = 0
+
+    def __init__(self,
+                 length: int,
+                 width: int,
+                 x_bounds: tuple[float, float],
+                 y_bounds: tuple[float, float],
+                 color_theme: Literal['dark'] | Literal['light'] = 'dark',
+                 supersampling: int = 2,
+                 kernel: Literal['box'] | Literal['tent'] = 'box') -> None:
+        """
+        Initializes a new supersampled canvas.
+        :param length: Length of the canvas, in pixels.
+        :param width: Width of the canvas, in pixels.
+        :param x_bounds: The x coordinates of the left and right edges of the canvas.
+        :param y_bounds: The y coordinates of the bottom and top edges of the canvas.
+        :param color_theme: Whether to use a dark or light background for the image (default: 'dark').
+        :param supersampling: The number of subpixels per pixel in each direction, between 1 and 8 (default: 2).
+        :param kernel: The kernel the subpixels are filtered with: 'box' averages the subpixels of each pixel, 'tent'
+                       weighs subpixels by their distance from the center of the pixel, reaching into neighbouring
+                       pixels (default: 'box').
+        """
+        if not 1 <= supersampling <= 8:
+            raise ValueError(f'Supersampling must be between 1 and 8, not {supersampling}')
+        _kernel_weights(kernel, supersampling)
+        self.color_theme = color_theme
+        self.off = 0 if color_theme == 'dark' else 255
+        self.on = 255 if color_theme == 'dark' else 0
+        self.supersampling = supersampling
+        self.kernel = kernel
+        dtype = np.min_scalar_type((1 << supersampling ** 2) - 1)
+        super().__init__(length, width, x_bounds, y_bounds, np.zeros(shape=(width, length), dtype=dtype))
+
+    def settings(self) -> dict[str, Any]:
+        return {'color_theme': self.color_theme, 'supersampling': self.supersampling, 'kernel': self.kernel}
+
+    @property
+    def pixel_size(self) -> tuple[float, float]:
+        """The size of a subpixel in the x and y directions, since points are placed on subpixels."""
+        return ((self.x_bounds[1] - self.x_bounds[0]) / (self.length * self.supersampling - 1),
+                (self.y_bounds[1] - self.y_bounds[0]) / (self.width * self.supersampling - 1))
+
+    def pixel_coordinates(self,
+                          points: npt.NDArray[np.float64]) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+        """
+        Calculates the subpixels the given points fall into.
+        :param points: The points, one (x, y) row per point.
+        :return: The column and row indices of the subpixels, with row 0 at the bottom of the canvas.
+        """
+        factor = self.supersampling
+        x_coords = _pixel_indices(points[:, 0], self.length * factor, self.x_bounds)
+        y_coords = _pixel_indices(points[:, 1], self.width * factor, self.y_bounds)
+        return x_coords, y_coords
+
+    def _bits(self,
+              x_coords: npt.NDArray[np.intp],
+              y_coords: npt.NDArray[np.intp]) -> tuple[tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]], np.ndarray]:
+        """Returns the pixels the given subpixels lie in, and the bits of the subpixels within them."""
+        factor = self.supersampling
+        dtype = self.data.dtype.type
+        bits = np.left_shift(dtype(1), ((y_coords % factor) * factor + x_coords % factor).astype(dtype))
+        return (y_coords // factor, x_coords // factor), bits
+
+    def data_rows(self, y_coords: npt.NDArray[np.intp]) -> npt.NDArray[np.intp]:
+        return y_coords // self.supersampling
+
+    def count_filled(self, x_coords: npt.NDArray[np.intp], y_coords: npt.NDArray[np.intp]) -> int:
+        """Counts how many of the given subpixels are already filled."""
+        pixels, bits = self._bits(x_coords, y_coords)
+        return np.count_nonzero(self.data[pixels] & bits)
+
+    def draw(self, x_coords: npt.NDArray[np.intp], y_coords: npt.NDArray[np.intp]) -> None:
+        pixels, bits = self._bits(x_coords, y_coords)
+        np.bitwise_or.at(self.data, pixels, bits)
+
+    def merge_data(self, target: np.ndarray, source: np.ndarray) -> None:
+        target |= source
+
+    def subpixels(self, rows: slice = slice(None)) -> npt.NDArray[np.bool_]:
+        """
+        Unpacks the subpixels of the given rows of pixels.
+        :param rows: The rows of pixels, with row 0 at the bottom of the canvas (default: all rows).
+        :return: The subpixels, of shape (rows * supersampling, length * supersampling).
+        """
+        factor = self.supersampling
+        masks = self.data[rows].astype(self.data.dtype.newbyteorder('<'))
+        bits = np.unpackbits(masks.view(np.uint8).reshape(*masks.shape, -1), axis=-1, bitorder='little')
+        bits = bits[..., :factor ** 2].reshape(len(masks), self.length, factor, factor)
+        return bits.transpose(0, 2, 1, 3).reshape(len(masks) * factor, self.length * factor).astype(np.bool_)
+
+    def coverage(self) -> npt.NDArray[np.float64]:
+        """
+        Filters the subpixels down to the pixels with the kernel of the canvas.
+        :return: The filled proportion of each pixel between 0 and 1, with the same shape as the canvas.
+        """
+        factor = self.supersampling
+        weights = _kernel_weights(self.kernel, factor)
+        coverage = np.empty(shape=self.data.shape, dtype=np.float64)
+        # Rows are filtered in stripes, each with one row of pixels of padding on both sides.
+        stripe = max(1, (1 << 22) // (self.length * factor ** 2))
+        for start in range(0, self.width, stripe):
+            stop = min(start + stripe, self.width)
+            subpixels = self.subpixels(slice(max(start - 1, 0), stop + 1)).astype(np.float64)
+            subpixels = np.pad(subpixels, ((factor if start == 0 else 0, factor if stop == self.width else 0),
+                                           (factor, factor)))
+            columns = _downscale(subpixels.T, self.length, factor, weights).T
+            coverage[start:stop] = _downscale(columns, stop - start, factor, weights)
+        return coverage
+
+    def to_image(self) -> 'Image.Image':
+        pixels = np.round(self.off + self.coverage() * (self.on - self.off)).astype(np.uint8)
+        return _to_image(np.flipud(pixels))
+
+
+class TiledCanvas(Canvas):
+    """
+    A binary canvas too large for memory, whose pixels are held in a file mapped into memory (numpy.memmap).
+
+    The file stores the canvas as square tiles, one after the other, with the top row of tiles first. Points are sorted
+    by the tile and pixel they fall into before they are drawn, so every batch touches each tile once. Once the tiles
+    touched since the last flush exceed the memory budget, the file is flushed and mapped again, which releases the
+    pages held in memory. The canvas can be written as a directory of PNG tiles or as a tiled TIFF file.
+    """
+    background = 0
+    filled = 255
+
+    def __init__(self,
+                 length: int,
+                 width: int,
+                 x_bounds: tuple[float, float],
+                 y_bounds: tuple[float, float],
+                 path: str | os.PathLike | None = None,
+                 tile_size: int = 1024,
+                 memory_budget: int = 256 * 2 ** 20,
+                 color_theme: Literal['dark'] | Literal['light'] = 'dark',
+                 overwrite: bool = True) -> None:
+        """
+        Initializes a new tiled canvas.
+        :param length: Length of the canvas, in pixels.
+        :param width: Width of the canvas, in pixels.
+        :param x_bounds: The x coordinates of the left and right edges of the canvas.
+        :param y_bounds: The y coordinates of the bottom and top edges of the canvas.
+        :param path: The file holding the tiles. If not given, a temporary file is used, which is removed by close.
+        :param tile_size: The length and width of a tile, in pixels (default: 1024).
+        :param memory_budget: The number of bytes of tiles that may be held in memory at once (default: 256 MiB).
+        :param color_theme: Whether to use a dark or light background for the image (default: 'dark').
+        :param overwrite: If False, the tiles already held in the file are kept instead of being cleared, for example to
+                          resume an interrupted render. The file must belong to a canvas of the same size and tile size
+                          (default: True).
+        """
+        self.tile_size = tile_size
+        self.memory_budget = memory_budget
+        self.color_theme = color_theme
+        self.off = 0 if color_theme == 'dark' else 255
+        self.on = 255 if color_theme == 'dark' else 0
+        self._temporary = path is None
+        if path is None:
+            import tempfile  # Only needed for temporary files
+            handle, path = tempfile.mkstemp(suffix='.tiles')
+            os.close(handle)
+        self.path = Path(path)
+        self._touched = 0
+        super().__init__(length, width, x_bounds, y_bounds,
+                         np.memmap(self.path, dtype=np.uint8, mode='w+' if overwrite or self._temporary else 'r+',
+                                   shape=self._data_shape(length, width)))
+
+    def settings(self) -> dict[str, Any]:
+        # The pixel values stay in the file, so a recreated canvas keeps them instead of clearing the file.
+        return {'path': str(self.path), 'tile_size': self.tile_size, 'memory_budget': self.memory_budget,
+                'color_theme': self.color_theme, 'overwrite': False}
+
+    @property
+    def tiles(self) -> tuple[int, int]:
+        """The number of rows and columns of tiles."""
+        return self.data.shape[:2]
+
+    def _data_shape(self, length: int, width: int) -> tuple[int, ...]:
+        return -(-width // self.tile_size), -(-length // self.tile_size), self.tile_size, self.tile_size
+
+    def _offsets(self, x_coords: npt.NDArray[np.intp], y_coords: npt.NDArray[np.intp]) -> npt.NDArray[np.intp]:
+        """Returns the positions of the given pixels in the file."""
+        rows = self.width - 1 - y_coords
+        tile_rows, pixel_rows = np.divmod(rows, self.tile_size)
+        tile_columns, pixel_columns = np.divmod(x_coords, self.tile_size)
+        return np.ravel_multi_index((tile_rows, tile_columns, pixel_rows, pixel_columns), self.data.shape)
+
+    def _fill_offsets(self, offsets: npt.NDArray[np.intp]) -> None:
+        """Fills the pixels at the given sorted positions in the file, flushing it once over the memory budget."""
+        self.data.reshape(-1)[offsets] = self.filled
+        self._touched += len(np.unique(offsets // self.tile_size ** 2)) * self.tile_size ** 2
+        if self._touched > self.memory_budget:
+            self.flush()
+
+    def count_filled(self, x_coords: npt.NDArray[np.intp], y_coords: npt.NDArray[np.intp]) -> int:
+        return np.count_nonzero(self.data.reshape(-1)[np.sort(self._offsets(x_coords, y_coords))])
+
+    def draw(self, x_coords: npt.NDArray[np.intp], y_coords: npt.NDArray[np.intp]) -> None:
+        self._fill_offsets(np.sort(self._offsets(x_coords, y_coords)))
+
+    def add(self, points: npt.NDArray[np.float64], metrics: 'RenderMetrics | None' = None) -> int:
+        # Points are bucketed by tile by sorting their positions in the file, which is only done once here.
+        start = time.perf_counter()
+        x_coords, y_coords = self.pixel_coordinates(points)
+        scaled = time.perf_counter()
+        offsets = np.sort(self._offsets(x_coords, y_coords))
+        filled = np.count_nonzero(self.data.reshape(-1)[offsets])
+        self._fill_offsets(offsets)
+        if metrics is not None:
+            metrics.add_time('scaling', scaled - start)
+            metrics.add_time('rasterization', time.perf_counter() - scaled)
+            metrics.add_buffer('pixel_coordinates', x_coords.nbytes + y_coords.nbytes + offsets.nbytes)
+        return filled
+
+    def merge_data(self, target: np.ndarray, source: np.ndarray) -> None:
+        np.maximum(target, source, out=target)
+
+    def flush(self) -> None:
+        """Writes the tiles to the file and maps it again, releasing the tiles held in memory."""
+        self.data.flush()
+        self.data = np.memmap(self.path, dtype=np.uint8, mode='r+', shape=self.data.shape)
+        self._touched = 0
+
+    def tile(self, row: int, column: int) -> npt.NDArray[np.uint8]:
+        """
+        Returns the pixel values of a tile, cropped to the canvas.
+        :param row: The row of the tile, with row 0 at the top of the canvas.
+        :param column: The column of the tile.
+        :return: The pixel values of the tile, with the top row first.
+        """
+        tile = self.data[row, column,
+                         :self.width - row * self.tile_size, :self.length - column * self.tile_size]
+        return np.where(tile == self.filled, self.on, self.off).astype(np.uint8)
+
+    def save_tiles(self, directory: str | os.PathLike, file_format: str = 'png') -> None:
+        """
+        Writes every tile into its own image file in the given directory, named after its row and column, with row 0 at
+        the top of the canvas.
+        :param directory: The directory to write the tiles into. It is created if it does not exist.
+        :param file_format: The file extension of the tiles (default: 'png').
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        rows, columns = self.tiles
+        for row in range(rows):
+            for column in range(columns):
+                _to_image(self.tile(row, column)).save(directory / f'{row}_{column}.{file_format}')
+            self.flush()
+
+    def save_tiff(self, path: str | os.PathLike) -> None:
+        """
+        Writes the canvas into a tiled TIFF file, one tile at a time. This needs the tifffile package.
+        :param path: The file to write to.
+        """
+        import tifffile  # Optional, only needed for writing tiled TIFF files
+
+        rows, columns = self.tiles
+
+        def tiles():
+            for row in range(rows):
+                for column in range(columns):
+                    tile = np.full(shape=(self.tile_size, self.tile_size), fill_value=self.off, dtype=np.uint8)
+                    cropped = self.tile(row, column)
+                    tile[:cropped.shape[0], :cropped.shape[1]] = cropped
+                    yield tile
+                self.flush()
+
+        tifffile.imwrite(path, tiles(), shape=(self.width, self.length), dtype=np.uint8,
+                         tile=(self.tile_size, self.tile_size), bigtiff=self.data.size >= 2 ** 32 - 2 ** 25)
+
+    def to_image(self) -> 'Image.Image':
+        """Converts the canvas into an image. This needs the whole canvas to fit into memory."""
+        rows, columns = self.tiles
+        return _to_image(np.block([[self.tile(row, column) for column in range(columns)] for row in range(rows)]))
+
+    def close(self) -> None:
+        """Releases the file holding the tiles, and removes it if it is a temporary file."""
+        self.data.flush()
+        self.data = np.empty(shape=(0, 0, self.tile_size, self.tile_size), dtype=np.uint8)
+        if self._temporary:
+            self.path.unlink(missing_ok=True)
+
+    def __enter__(self) -> 'TiledCanvas':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class DensityBuffer(Canvas):
+    """
+    A canvas counting how many points fell into each pixel. Density buffers with the same shape and bounds can be
+    summed, so partial renders from several runs or processes can be merged before tone mapping.
+    """
+    def __init__(self,
+                 length: int,
+                 width: int,
+                 x_bounds: tuple[float, float],
+                 y_bounds: tuple[float, float],
+                 counts: npt.NDArray[np.uint32] | None = None) -> None:
+        """
+        Initializes a new density buffer.
+        :param length: Length of the buffer, in pixels.
+        :param width: Width of the buffer, in pixels.
+        :param x_bounds: The x coordinates of the left and right edges of the buffer.
+        :param y_bounds: The y coordinates of the bottom and top edges of the buffer.
+        :param counts: Initial counts of shape (width, length). If not given, all counts start at zero.
+        """
+        if counts is None:
+            counts = np.zeros(shape=(width, length), dtype=np.uint32)
+        super().__init__(length, width, x_bounds, y_bounds, counts)
+
+    @property
+    def counts(self) -> npt.NDArray[np.uint32]:
+        """The number of points that fell into each pixel."""
+        return self.data
+
+    @classmethod
+    def load(cls, path) -> 'DensityBuffer':
+        """
+        Loads a density buffer saved with DensityBuffer.save.
+        :param path: The file to load the buffer from.
+        :return: The loaded density buffer.
+        """
+        with np.load(path) as data:
+            width, length = data['counts'].shape
+            return cls(length, width, tuple(data['x_bounds']), tuple(data['y_bounds']), counts=data['counts'])
+
+    def save(self, path) -> None:
+        """
+        Saves the density buffer to a .npz file so that it can be merged with buffers from other processes later.
+        :param path: The file to save the buffer to.
+        """
+        np.savez_compressed(path, counts=self.counts, x_bounds=self.x_bounds, y_bounds=self.y_bounds)
+
+    def draw(self, x_coords: npt.NDArray[np.intp], y_coords: npt.NDArray[np.intp]) -> None:
+        indices = y_coords * self.length + x_coords
+        counts = self.data.reshape(-1)
+        # A full-size bincount pass only pays off for batches that are large compared to the buffer.
+        if 4 * len(indices) >= counts.size:
+            counts += np.bincount(indices, minlength=counts.size).astype(np.uint32)
+        else:
+            np.add.at(counts, indices, 1)
+
+    def merge_data(self, target: np.ndarray, source: np.ndarray) -> None:
+        target += source
+
+    def __iadd__(self, other: 'DensityBuffer') -> 'DensityBuffer':
+        if not isinstance(other, DensityBuffer):
+            return NotImplemented
+        if (self.length, self.width, self.x_bounds, self.y_bounds) != \
+                (other.length, other.width, other.x_bounds, other.y_bounds):
+            raise ValueError('Only density buffers with the same shape and bounds can be merged')
+        self.data += other.data
+        return self
+
+    def __add__(self, other: 'DensityBuffer') -> 'DensityBuffer':
+        if not isinstance(other, DensityBuffer):
+            return NotImplemented
+        merged = DensityBuffer(self.length, self.width, self.x_bounds, self.y_bounds, counts=self.counts.copy())
+        merged += other
+        return merged
+
+    def tone_map(self,
+                 tone_mapping: Literal['log'] | Literal['gamma'] | Literal['linear'] = 'log',
+                 gamma: float = 2.2) -> npt.NDArray[np.float64]:
+        """
+        Maps the counts onto intensities between 0 and 1.
+        :param tone_mapping: 'log' for logarithmic scaling of the counts, 'gamma' for gamma correction of the linearly
+                             scaled counts, or 'linear' (default: 'log').
+        :param gamma: The gamma used for gamma correction (default: 2.2).
+        :return: The intensities, with the same shape as the counts.
+        """
+        peak = self.counts.max()
+        if peak == 0:
+            return np.zeros(shape=self.counts.shape, dtype=np.float64)
+        match tone_mapping:
+            case 'log':
+                return np.log1p(self.counts) / np.log1p(peak)
+            case 'gamma':
+                return (self.counts / peak) ** (1 / gamma)
+            case 'linear':
+                return self.counts / peak
+            case _:
+                raise ValueError(f'Unknown tone mapping: {tone_mapping!r}')
+
+    def to_image(self,
+                 tone_mapping: Literal['log'] | Literal['gamma'] | Literal['linear'] = 'log',
+                 gamma: float = 2.2,
+                 colormap: str | Colormap | None = None) -> 'Image.Image':
+        """
+        Converts the counts into an RGB image.
+        :param tone_mapping: 'log' for logarithmic scaling of the counts, 'gamma' for gamma correction of the linearly
+                             scaled counts, or 'linear' (default: 'log').
+        :param gamma: The gamma used for gamma correction (default: 2.2).
+        :param colormap: The name of a matplotlib colormap, or a function mapping intensities between 0 and 1 onto RGB
+                         or RGBA values between 0 and 1. If not given, a grayscale image is produced.
+        :return: A PIL.Image.Image object that contains the image.
+        """
+        colors = _get_colormap(colormap)(self.tone_map(tone_mapping, gamma))[..., :3]
+        return _to_image(np.flipud(np.round(255 * colors).astype(np.uint8)))
@@ -1,10 +1,13 @@
+from collections.abc import Generator
+
 import matplotlib.pyplot as plt  # Plotting functions
 import numpy as np  # Array and matrix representation
 import numpy.typing as npt
 
+from fractals.line_construction.koch import koch
+
 
 type Vector2 = npt.NDArray[np.float64]
-type Line2 = tuple[Vector2, Vector2]
 
 
 def rotation(angle_degrees: float) -> npt.NDArray[np.float64]:
@@ -12,42 +15,91 @@ def rotation(angle_degrees: float) -> npt.NDArray[np.float64]:
                      [np.sin(np.radians(angle_degrees)),  np.cos(np.radians(angle_degrees))]])
 
 
-def _dragon_helper(start_point: Vector2, end_point: Vector2, depth: int) -> list[Line2]:
-    if depth == 0:
-        return [(start_point, end_point)]
-    R = rotation(60)
-    A = -(R - 2 * np.identity(2)) / 3
-    B = (R + np.identity(2)) / 3
-    points = [start_point,
-              (end_point - start_point) / 3 + start_point,
-              A@start_point + B@end_point,
-              2 * (end_point - start_point) / 3 + start_point,
-              end_point]
-    lines = [line for line in zip(points, points[1:])]
-    out_lines = lines.copy()
-    for index, line in enumerate(lines):
-        out_lines[index] = _dragon_helper(line[0], line[1], depth - 1)
-    return [line for lines in out_lines for line in lines]
-
-
-def dragon(start_point: Vector2, end_point: Vector2, depth: int) -> list[Vector2]:
-    lines = _dragon_helper(start_point, end_point, depth)
-    return [line[0] for line in lines] + [lines[-1][1]]
-
-def iter_dragon(points): 
-    new_points=[]
-    R = rotation(90)
-       #what...points[-1]
-    for i in range(len(points)-2,-1,-1):
-        new_points.append(R.dot(points[i] - points[-1]) + points[-1])
-    return points + new_points
-      #goes somewhere ^^
-     
-#define a new list to hold new points
-#for loop to run through all the old points and rotate the by the appropriate amount, and return both the old and new points
-
-
-
+def dragon(start_point: Vector2, end_point: Vector2, depth: int) -> npt.NDArray[np.float64]:
+    # This has always drawn the Koch curve; the dragon curve itself is built by unfold_dragon.
+    return koch(start_point, end_point, depth)
+
+
+def _fold(points: npt.NDArray[np.float64], npoints: int) -> None:
+    """
+    Unfolds the dragon curve held by the first npoints rows of the array into its first 2 * npoints - 1 rows: the curve
+    is reversed and rotated by 90 degrees about its last point. The rotation swaps the coordinates relative to the pivot
+    and negates one of them, which is written straight into the array without temporary arrays.
+    """
+    pivot_x, pivot_y = points[npoints - 1]
+    source = points[npoints - 2::-1]
+    target = points[npoints:2 * npoints - 1]
+    np.subtract(pivot_x + pivot_y, source[:, 1], out=target[:, 0])
+    np.subtract(source[:, 0], pivot_x - pivot_y, out=target[:, 1])
+
+
+def iter_dragon(points: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """Unfolds a dragon curve once, returning the vertices of the curve with twice as many segments."""
+    points = np.asarray(points, dtype=np.float64)
+    unfolded = np.empty(shape=(2 * len(points) - 1, 2), dtype=np.float64)
+    unfolded[:len(points)] = points
+    _fold(unfolded, len(points))
+    return unfolded
+
+
+def unfold_dragon(start_point: Vector2, end_point: Vector2, depth: int) -> npt.NDArray[np.float64]:
+    """
+    Builds the dragon curve by unfolding the segment from start_point to end_point depth times, like calling iter_dragon
+    depth times. The vertices are unfolded in place in one array allocated up front, with one vectorized rotation per
+    fold, so memory use is the size of the result, 2 ** depth + 1 vertices.
+    """
+    points = np.empty(shape=(2 ** depth + 1, 2), dtype=np.float64)
+    points[0], points[1] = start_point, end_point
+    for level in range(depth):
+        _fold(points, 2 ** level + 1)
+    return points
+
+
+def dragon_chunks(start_point: Vector2,
+                  end_point: Vector2,
+                  depth: int,
+                  chunk_size: int = 2 ** 16) -> Generator[npt.NDArray[np.float64], None, None]:
+    """
+    Generates the vertices of the same curve as unfold_dragon in chunks, so curves too deep to fit into memory can be
+    streamed, for example into a file. Memory use is bounded by the chunk size.
+
+    Every segment of the curve is the first segment rotated by a multiple of 90 degrees. The curve turns right at vertex
+    n if the odd part of n is 1 modulo 4 and left otherwise (the regular paperfolding sequence), so the direction of
+    every segment follows from a running sum of turns, and every vertex from running sums of directions. Both sums are
+    integers, carried exactly from chunk to chunk, so the last chunk is as accurate as the first.
+
+    :param start_point: The first vertex of the curve.
+    :param end_point: The second vertex of the curve.
+    :param depth: The number of times the curve is unfolded.
+    :param chunk_size: The number of vertices in each chunk; the last chunk may be shorter (default: 2 ** 16).
+    :return: A generator of arrays of consecutive vertices, one (x, y) row per vertex.
+    """
+    if chunk_size < 1:
+        raise ValueError(f'Chunks need at least one vertex, got a chunk size of {chunk_size}')
+    start_point = np.asarray(start_point, dtype=np.float64)
+    step = np.asarray(end_point, dtype=np.float64) - start_point
+    normal = np.array([-step[1], step[0]])
+    # The multiples of the first segment and of its normal making up a segment in each of the four directions.
+    along, across = np.array([1, 0, -1, 0]), np.array([0, 1, 0, -1])
+
+    direction = 0
+    position = np.zeros(shape=2, dtype=np.int64)
+    nvertices = 2 ** depth + 1
+    for lower in range(0, nvertices, chunk_size):
+        # The segments starting at the vertices of the chunk, with the turns made at those vertices.
+        indices = np.arange(lower, min(lower + chunk_size, nvertices), dtype=np.int64)
+        odd_parts = indices // np.maximum(indices & -indices, 1)
+        turns = np.where(odd_parts % 4 == 1, -1, 1)
+        turns[indices == 0] = 0
+        directions = (direction + np.cumsum(turns)) % 4
+        steps = np.stack([along[directions], across[directions]], axis=1)
+        positions = np.empty(shape=(len(indices), 2), dtype=np.int64)
+        positions[0] = position
+        np.cumsum(steps[:-1], axis=0, out=positions[1:])
+        positions[1:] += position
+        direction = directions[-1]
+        position = positions[-1] + steps[-1]
+        yield start_point + positions[:, :1] * step + positions[:, 1:] * normal
 
 
 def main() -> None:
@@ -55,11 +107,8 @@ def main() -> None:
 
     x = np.array([0, 0])
     y = np.array([1, 0])
-    points = [x,y]
-    for i in range(0,18):
-        points = iter_dragon(points)
+    points = unfold_dragon(x, y, 18)
     #points = np.array(koch(x, y, 6))
-    points = np.array(points)
     
     fig, ax = plt.subplots(figsize=(20, 20))
     ax.plot(points[:,0], points[:, 1],color='#00FF00')
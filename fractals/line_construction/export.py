@@ -0,0 +1,208 @@
+"""
+Writing the vertices of line constructions to files as they are generated, chunk by chunk, so curves with far more
+vertices than can be plotted are still saved with memory bounded by the chunk size.
+
+The chunks come from generators such as koch_chunks, levyc_chunks and dragon_chunks. Three formats are supported:
+
+- binary: raw little-endian floats, x and y interleaved, without a header. The vertices are read back without copying
+  by memory-mapping the file (see read_binary).
+- CSV: one 'x,y' row per vertex after an 'x,y' header, with enough digits to read back the exact floats.
+- SVG: a single path through all vertices, drawn one pixel wide however far it is zoomed.
+"""
+
+
+from collections.abc import Callable, Generator, Iterable
+import argparse
+import os
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import numpy.typing as npt
+
+
+__all__ = ['BINARY_DTYPE', 'write_binary', 'read_binary', 'write_csv', 'write_svg', 'save_curve']
+
+
+# The default type of the coordinates of binary files: little-endian 64-bit floats.
+BINARY_DTYPE = np.dtype('<f8')
+
+
+type Format = Literal['binary'] | Literal['csv'] | Literal['svg']
+
+_SUFFIXES: dict[str, Format] = {'.bin': 'binary', '.raw': 'binary', '.f64': 'binary', '.csv': 'csv', '.svg': 'svg'}
+
+
+def _format_rows(chunk: npt.NDArray[np.float64], row_format: str) -> str:
+    """Formats every vertex of a chunk with the given format of two numbers, in a single formatting call."""
+    return (row_format * len(chunk)) % tuple(chunk.ravel().tolist())
+
+
+def write_binary(path: str | os.PathLike,
+                 chunks: Iterable[npt.ArrayLike],
+                 dtype: npt.DTypeLike = BINARY_DTYPE) -> int:
+    """
+    Writes vertices to a raw binary file, x and y interleaved, without a header.
+    :param path: The file to write to.
+    :param chunks: The vertices in chunks of consecutive vertices, one (x, y) row per vertex.
+    :param dtype: The type the coordinates are written as, such as '<f4' for half the size (default: BINARY_DTYPE).
+    :return: The number of vertices written.
+    """
+    dtype = np.dtype(dtype)
+    nvertices = 0
+    with open(path, 'wb') as file:
+        for chunk in chunks:
+            # No copy is made if the chunk already has the right type and layout.
+            chunk = np.ascontiguousarray(chunk, dtype=dtype)
+            file.write(chunk.data)
+            nvertices += len(chunk)
+    return nvertices
+
+
+def read_binary(path: str | os.PathLike, dtype: npt.DTypeLike = BINARY_DTYPE) -> npt.NDArray[np.floating]:
+    """
+    Reads the vertices of a binary file written by write_binary without copying them: the file is memory-mapped, so
+    only the parts of it which are accessed are loaded.
+    :param path: The file to read.
+    :param dtype: The type the coordinates were written as (default: BINARY_DTYPE).
+    :return: The vertices, of shape (N, 2), as a read-only np.memmap of the file.
+    """
+    if os.path.getsize(path) == 0:
+        # Empty files cannot be memory-mapped.
+        return np.empty(shape=(0, 2), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r').reshape(-1, 2)
+
+
+def write_csv(path: str | os.PathLike, chunks: Iterable[npt.ArrayLike]) -> int:
+    """
+    Writes vertices to a CSV file with an 'x,y' header, with 17 significant digits so the floats read back exactly.
+    :param path: The file to write to.
+    :param chunks: The vertices in chunks of consecutive vertices, one (x, y) row per vertex.
+    :return: The number of vertices written.
+    """
+    nvertices = 0
+    with open(path, 'w', newline='') as file:
+        file.write('x,y\n')
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=np.float64)
+            file.write(_format_rows(chunk, '%.17g,%.17g\n'))
+            nvertices += len(chunk)
+    return nvertices
+
+
+def write_svg(path: str | os.PathLike,
+              chunks: Iterable[npt.ArrayLike],
+              precision: int = 8,
+              color: str = 'black',
+              padding: float = 0.02) -> int:
+    """
+    Writes vertices to an SVG file as a single path, with the y axis pointing up as in matplotlib.
+
+    The view box of the picture has to come before the path, but is only known once every vertex has been seen. Room for
+    it is left in the header and it is filled in at the end, so the vertices are only read once.
+
+    :param path: The file to write to.
+    :param chunks: The vertices in chunks of consecutive vertices, one (x, y) row per vertex.
+    :param precision: The number of significant digits of the coordinates, which should resolve the shortest segments
+                      relative to the size of the curve (default: 8).
+    :param color: The color of the path (default: 'black').
+    :param padding: The margin around the curve on each side, as a proportion of the larger side of its bounds
+                    (default: 0.02).
+    :return: The number of vertices written.
+    """
+    number_width = precision + 8  # Room for a sign, a decimal point and an exponent
+    view_box_width = len('viewBox=""') + 4 * number_width + 3
+    row_format = f'%.{precision}g,%.{precision}g '
+    lower, upper = np.full(2, np.inf), np.full(2, -np.inf)
+    nvertices = 0
+    with open(path, 'wb') as file:
+        file.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<svg xmlns="http://www.w3.org/2000/svg" ')
+        view_box_position = file.tell()
+        file.write(b' ' * view_box_width + b'>\n')
+        file.write(f'<path fill="none" stroke="{color}" stroke-width="1" vector-effect="non-scaling-stroke" '
+                   f'stroke-linejoin="round" d="'.encode())
+        for chunk in chunks:
+            # SVG has the y axis pointing down. Subtracting from 0 rather than negating keeps 0 from turning into -0.
+            chunk = np.array(chunk, dtype=np.float64)
+            if not len(chunk):
+                continue
+            np.subtract(0, chunk[:, 1], out=chunk[:, 1])
+            lower, upper = np.minimum(lower, chunk.min(axis=0)), np.maximum(upper, chunk.max(axis=0))
+            if not nvertices:
+                file.write(b'M')
+            file.write(_format_rows(chunk, row_format).encode())
+            nvertices += len(chunk)
+        file.write(b'"/>\n</svg>\n')
+
+        if nvertices:
+            margin = padding * max(upper - lower)
+            size = np.maximum(upper - lower + 2 * margin, 10.0 ** -precision)
+            view_box = ' '.join(f'{value:.{precision}g}' for value in (*(lower - margin), *size))
+            file.seek(view_box_position)
+            file.write(f'viewBox="{view_box}"'.encode())
+    return nvertices
+
+
+def save_curve(path: str | os.PathLike,
+               chunks: Iterable[npt.ArrayLike],
+               file_format: Format | None = None) -> int:
+    """
+    Writes vertices to a file as they are generated, in one of the supported formats (see write_binary, write_csv and
+    write_svg).
+    :param path: The file to write to.
+    :param chunks: The vertices in chunks of consecutive vertices, one (x, y) row per vertex.
+    :param file_format: 'binary', 'csv' or 'svg'. If not given, it is found from the suffix of the path: .bin, .raw or
+                        .f64 for binary, .csv or .svg.
+    :return: The number of vertices written.
+    """
+    if file_format is None:
+        suffix = Path(path).suffix.lower()
+        if suffix not in _SUFFIXES:
+            raise ValueError(f'Cannot tell the format of {str(path)!r} from its suffix, expected one of '
+                             f'{", ".join(_SUFFIXES)}')
+        file_format = _SUFFIXES[suffix]
+    match file_format:
+        case 'binary':
+            return write_binary(path, chunks)
+        case 'csv':
+            return write_csv(path, chunks)
+        case 'svg':
+            return write_svg(path, chunks)
+        case _:
+            raise ValueError(f'Unknown format: {file_format!r}')
+
+
+def _curves() -> dict[str, Callable[[int, int], Generator[npt.NDArray[np.float64], None, None]]]:
+    """The chunk generators of the curves of this package, each taking a depth and a chunk size."""
+    from fractals.line_construction.dragon_curve import dragon_chunks
+    from fractals.line_construction.koch import koch_chunks
+    from fractals.line_construction.levy_c import levyc_chunks
+
+    return {
+        'koch': lambda depth, chunk_size: koch_chunks(np.array([-1, 0]), np.array([1, 0]), depth, chunk_size),
+        'levyc': lambda depth, chunk_size: levyc_chunks(np.array([-1, 0]), np.array([1, 0]), depth, chunk_size),
+        'dragon': lambda depth, chunk_size: dragon_chunks(np.array([0, 0]), np.array([1, 0]), depth, chunk_size),
+    }
+
+
+def main() -> None:
+    curves = _curves()
+    parser = argparse.ArgumentParser(prog='python -m fractals.line_construction.export',
+                                     description='Writes the vertices of a line construction to a file as they are '
+                                                 'generated.')
+    parser.add_argument('curve', choices=curves, help='the curve to write')
+    parser.add_argument('depth', type=int, help='the number of times the curve is subdivided or unfolded')
+    parser.add_argument('output', help='the file to write, whose suffix gives the format: '
+                                       f'{", ".join(_SUFFIXES)}')
+    parser.add_argument('--chunk-size', type=int, default=2 ** 16, help='the number of vertices generated at once')
+    args = parser.parse_args()
+
+    try:
+        nvertices = save_curve(args.output, curves[args.curve](args.depth, args.chunk_size))
+    except ValueError as error:
+        parser.error(str(error))
+    print(f'Wrote {nvertices} vertices to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
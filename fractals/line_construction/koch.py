@@ -1,10 +1,13 @@
+from collections.abc import Generator
+
 import matplotlib.pyplot as plt  # Plotting functions
 import numpy as np  # Array and matrix representation
 import numpy.typing as npt
 
+from fractals.line_construction.subdivision import subdivide, subdivide_chunks
+
 
 type Vector2 = npt.NDArray[np.float64]
-type Line2 = tuple[Vector2, Vector2]
 
 
 def rotation(angle_degrees: float) -> npt.NDArray[np.float64]:
@@ -12,27 +15,22 @@ def rotation(angle_degrees: float) -> npt.NDArray[np.float64]:
                      [np.sin(np.radians(angle_degrees)),  np.cos(np.radians(angle_degrees))]])
 
 
-def _koch_helper(start_point: Vector2, end_point: Vector2, depth: int) -> list[Line2]:
-    if depth == 0:
-        return [(start_point, end_point)]
-    R = rotation(60)
-    A = -(R - 2 * np.identity(2)) / 3
-    B = (R + np.identity(2)) / 3
-    points = [start_point,
-              (end_point - start_point) / 3 + start_point,
-              A@start_point + B@end_point,
-              2 * (end_point - start_point) / 3 + start_point,
-              end_point]
-    lines = [line for line in zip(points, points[1:])]
-    out_lines = lines.copy()
-    for index, line in enumerate(lines):
-        out_lines[index] = _koch_helper(line[0], line[1], depth - 1)
-    return [line for lines in out_lines for line in lines]
-
-
-def koch(start_point: Vector2, end_point: Vector2, depth: int) -> list[Vector2]:
-    lines = _koch_helper(start_point, end_point, depth)
-    return [line[0] for line in lines] + [lines[-1][1]]
+# A segment from p to q is replaced by the segments through p + (q - p) / 3, the tip p + (R + I) (q - p) / 3 of the
+# equilateral triangle on its middle third, with R the rotation by 60 degrees, and p + 2 (q - p) / 3.
+_R = rotation(60)
+_RULE = np.array([np.identity(2) / 3, (_R + np.identity(2)) / 3, 2 * np.identity(2) / 3])
+
+
+def koch(start_point: Vector2, end_point: Vector2, depth: int) -> npt.NDArray[np.float64]:
+    return subdivide([start_point, end_point], _RULE, depth)
+
+
+def koch_chunks(start_point: Vector2,
+                end_point: Vector2,
+                depth: int,
+                chunk_size: int = 2 ** 16) -> Generator[npt.NDArray[np.float64], None, None]:
+    """Generates the vertices of the same curve as koch in chunks, to stream deep curves (see subdivide_chunks)."""
+    return subdivide_chunks([start_point, end_point], _RULE, depth, chunk_size)
 
 
 def main() -> None:
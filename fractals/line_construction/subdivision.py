@@ -0,0 +1,108 @@
+"""
+Curves built by repeatedly replacing every segment of a polyline with a smaller copy of a fixed polyline, such as the
+Koch curve and the Lévy C curve.
+"""
+
+
+from collections.abc import Generator
+
+import numpy as np
+import numpy.typing as npt
+
+
+__all__ = ['subdivide', 'subdivide_chunks']
+
+
+def _check(vertices: npt.NDArray[np.float64], rule: npt.NDArray[np.float64], depth: int) -> None:
+    if vertices.ndim != 2 or vertices.shape[1] != 2 or len(vertices) < 2:
+        raise ValueError(f'A polyline needs at least two vertices of shape (2,), '
+                         f'got an array of shape {vertices.shape}')
+    if rule.ndim != 3 or rule.shape[1:] != (2, 2):
+        raise ValueError(f'A subdivision rule must have shape (k, 2, 2), got {rule.shape}')
+    if depth < 0:
+        raise ValueError(f'The depth must not be negative, got {depth}')
+
+
+def subdivide(vertices: npt.ArrayLike, rule: npt.ArrayLike, depth: int) -> npt.NDArray[np.float64]:
+    """
+    Subdivides every segment of a polyline depth times. A rule of k matrices L_1, ..., L_k replaces the segment from p
+    to q with the segments through the points p, p + L_1 (q - p), ..., p + L_k (q - p), q, so every level multiplies
+    the number of segments by k + 1.
+
+    Each level is applied to the vertices of all segments at once, so the cost is proportional to the number of
+    vertices of the result and no Python objects are created per segment.
+
+    :param vertices: The vertices of the polyline to start with, one (x, y) row per vertex, such as the start and end
+                     point of a single segment.
+    :param rule: The matrices placing the new vertices of a segment relative to it, of shape (k, 2, 2).
+    :param depth: The number of times every segment is subdivided.
+    :return: The vertices of the subdivided polyline, of shape ((k + 1) ** depth * (n - 1) + 1, 2) for n vertices.
+    """
+    vertices = np.array(vertices, dtype=np.float64)
+    rule = np.asarray(rule, dtype=np.float64)
+    _check(vertices, rule, depth)
+
+    nnew = len(rule)
+    for _ in range(depth):
+        starts = vertices[:-1]
+        nsegments = len(starts)
+        result = np.empty(shape=(nsegments * (nnew + 1) + 1, 2), dtype=np.float64)
+        # Every segment owns its start vertex followed by its new vertices; the end of the last segment comes last.
+        segments = result[:-1].reshape(nsegments, nnew + 1, 2)
+        segments[:, 0] = starts
+        np.einsum('kij,nj->nki', rule, vertices[1:] - starts, out=segments[:, 1:])
+        segments[:, 1:] += starts[:, np.newaxis]
+        result[-1] = vertices[-1]
+        vertices = result
+    return vertices
+
+
+def subdivide_chunks(vertices: npt.ArrayLike,
+                     rule: npt.ArrayLike,
+                     depth: int,
+                     chunk_size: int = 2 ** 16) -> Generator[npt.NDArray[np.float64], None, None]:
+    """
+    Generates the vertices of the same polyline as subdivide in chunks, so curves too large to fit into memory can be
+    streamed, for example into a file.
+
+    Subdividing a segment depth times gives the same vertices as subdividing it depth - t times and then subdividing
+    every resulting segment t more times. The inner depth t is chosen so a group of segments subdivided t times fits
+    into a chunk, and the coarser polyline is itself streamed in chunks, so memory use is bounded by a few chunks per
+    level of this recursion, of which there are about log(number of vertices) / log(chunk size).
+
+    :param vertices: The vertices of the polyline to start with, one (x, y) row per vertex.
+    :param rule: The matrices placing the new vertices of a segment relative to it, of shape (k, 2, 2).
+    :param depth: The number of times every segment is subdivided.
+    :param chunk_size: The largest number of vertices in a chunk, unless a single segment subdivided once has more
+                       (default: 2 ** 16).
+    :return: A generator of arrays of consecutive vertices, one (x, y) row per vertex.
+    """
+    vertices = np.array(vertices, dtype=np.float64)
+    rule = np.asarray(rule, dtype=np.float64)
+    _check(vertices, rule, depth)
+    if chunk_size < 2:
+        raise ValueError(f'Chunks need at least two vertices, got a chunk size of {chunk_size}')
+
+    factor = len(rule) + 1
+    if (len(vertices) - 1) * factor ** depth + 1 <= chunk_size:
+        yield subdivide(vertices, rule, depth)
+        return
+    if depth == 0:
+        yield from (vertices[start:start + chunk_size] for start in range(0, len(vertices), chunk_size))
+        return
+
+    inner_depth = 1
+    while inner_depth < depth and factor ** (inner_depth + 1) + 1 <= chunk_size:
+        inner_depth += 1
+    nsegments = max(1, (chunk_size - 1) // factor ** inner_depth)
+    coarse_chunks = subdivide_chunks(vertices, rule, depth - inner_depth, chunk_size)
+
+    # The coarse vertices not yet subdivided. Consecutive groups of segments share a vertex, which is only yielded with
+    # the later group.
+    pending = np.empty(shape=(0, 2), dtype=np.float64)
+    for coarse in coarse_chunks:
+        pending = np.concatenate([pending, coarse])
+        while len(pending) > nsegments + 1:
+            yield subdivide(pending[:nsegments + 1], rule, inner_depth)[:-1]
+            pending = pending[nsegments:]
+    yield subdivide(pending, rule, inner_depth)
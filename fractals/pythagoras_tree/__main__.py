@@ -1,64 +1,51 @@
+import argparse
+
 import numpy as np
 import matplotlib.pyplot as plt
 
 from matplotlib.collections import PatchCollection
 from matplotlib.patches import Rectangle 
-from collections import deque
 from dataclasses import dataclass
-from matplotlib.transforms import Affine2D
 from matplotlib.patches import Polygon
 
-#This function performs an affine transformation on a polygon
-def transform_polygon(transform: Affine2D, poly: Polygon) -> Polygon:
-    return Polygon(transform.transform(poly.get_verts()))
+from fractals.pythagoras_tree.render import save_tree, tree_collection
+from fractals.pythagoras_tree.tree import MIN_LEG, tree_levels
 
-#Creates a unit square as the starting square
-def unit_square() -> Polygon:
-    return Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])
 
-#This will be used later
-MIN_LEG = 0.01
+def pythagoras_tree(alpha: float = 30, min_leg: float = MIN_LEG) -> list[Polygon]:
+    """
+    Builds the squares of a Pythagoras tree, starting from the unit square, until their sides are at most min_leg long.
+    The squares are generated level by level as arrays (see fractals.pythagoras_tree.tree.tree_levels).
+    :param alpha: The angle at the base of the triangle between a square and its two children, in degrees (default: 30).
+    :param min_leg: Squares whose width or height is at most this are not branched any further (default: MIN_LEG).
+    :return: The squares of the tree as polygons, level after level.
+    """
+    return [Polygon(square) for level in tree_levels(alpha, min_leg) for square in level]
 
 
 def main() -> None:
-    #Declaring all variables
-    alpha = 30
-    alpha_rad = np.radians(alpha)
-    cos_alph = np.cos(alpha_rad)
-    sin_alph = np.sin(alpha_rad)
-    
-    #The affine transformations that both rotate and scale the square 
-    counter_clockwise_transform = Affine2D.from_values(cos_alph**2, cos_alph*sin_alph, -cos_alph*sin_alph, cos_alph**2, 0, 1)
-
-    clock_wise_transform= Affine2D.from_values(sin_alph**2, -cos_alph*sin_alph, cos_alph*sin_alph, sin_alph**2, cos_alph **2, 1 + cos_alph*sin_alph)
+    parser = argparse.ArgumentParser(prog='python -m fractals.pythagoras_tree',
+                                     description='Draws a Pythagoras tree, in a window or into a file.')
+    parser.add_argument('output', nargs='?', help='save the tree to this file, such as tree.png or tree.svg, '
+                                                  'instead of showing it')
+    parser.add_argument('--alpha', type=float, default=30, help='angle at the base of each triangle, in degrees')
+    parser.add_argument('--min-leg', type=float, default=MIN_LEG, help='squares this small are not branched further')
+    parser.add_argument('--size', type=int, nargs=2, default=(1600, 1200), metavar=('LENGTH', 'WIDTH'),
+                        help='size of the saved picture, in pixels')
+    args = parser.parse_args()
+
+    if args.output is not None:
+        save_tree(args.output, args.alpha, args.min_leg, length=args.size[0], width=args.size[1])
+        return
 
-    #Creating a pythagorus tree 
-    tbprocessed = deque([unit_square()]) #Making a double ended queue for squares
-    
     #Setting the basics of the plot including the limits of the axes
     fig, axe = plt.subplots()
     axe.set_xlim(-5, 5)
     axe.set_ylim(0, 5)
     axe.set_aspect("equal") #Ensures the picture isn't warped or stretched weirdly
 
-
-    while tbprocessed: 
-        rect = tbprocessed.pop() #Removes one item from the end of the double ended queue
-
-        #The rectangles transformed
-        cctrans = transform_polygon(counter_clockwise_transform, rect)
-        cwtrans = transform_polygon(clock_wise_transform, rect)
-
-        #Checks that the width and height of the square is less than 0.01 to ensure the code doesn't run forever
-        if MIN_LEG < cctrans.get_tightbbox().width and MIN_LEG < cctrans.get_tightbbox().height:
-            #Appends a new vector with its starting point to the double ended queue
-            tbprocessed.appendleft(cctrans)
-
-        if MIN_LEG < cwtrans.get_tightbbox().width and MIN_LEG < cwtrans.get_tightbbox().height:
-            tbprocessed.appendleft(cwtrans)
-        
-        #Creatinga new rectangle
-        axe.add_patch(rect)
+    #Drawing all squares of the tree at once, colored by their depth
+    axe.add_collection(tree_collection(list(tree_levels(args.alpha, args.min_leg))))
 
     plt.show()
 
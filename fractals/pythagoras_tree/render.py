@@ -0,0 +1,234 @@
+"""
+Drawing Pythagoras trees from the vertex arrays of their levels (see fractals.pythagoras_tree.tree), without a window.
+
+A tree is either rasterized directly into an image, which stays fast for millions of squares, or drawn as a single
+matplotlib PolyCollection, which also gives vector output such as SVG. Both color each square by its depth.
+"""
+
+
+from collections.abc import Callable, Sequence
+import os
+from pathlib import Path
+import numpy as np
+import numpy.typing as npt
+from typing import Literal, TYPE_CHECKING
+
+from fractals.pythagoras_tree.tree import MIN_LEG, tree_levels
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from matplotlib.collections import PolyCollection
+    from matplotlib.figure import Figure
+
+
+__all__ = ['tree_bounds', 'depth_colors', 'rasterize_tree', 'tree_collection', 'tree_figure', 'save_tree']
+
+
+type Colormap = Callable[[npt.NDArray[np.float64]], npt.NDArray[np.float64]]
+
+# The largest number of pixels tested against squares at once while rasterizing.
+_MAX_PIXELS = 2 ** 22
+
+
+def tree_bounds(levels: Sequence[npt.NDArray[np.float64]],
+                length: int,
+                width: int,
+                padding: float = 0.05) -> tuple[tuple[float, float], tuple[float, float]]:
+    """
+    Returns x and y bounds framing all squares of the tree with padding, widened along one axis to the aspect ratio of
+    an image of the given size, so squares stay square.
+    :param levels: The levels of the tree, each an array of shape (N, 4, 2).
+    :param length: Length of the image, in pixels.
+    :param width: Width of the image, in pixels.
+    :param padding: The margin around the tree on each side, as a proportion of the larger side of its bounds (default:
+                    0.05).
+    :return: The x and y bounds.
+    """
+    x_min, y_min = np.min([level.min(axis=(0, 1)) for level in levels if len(level)], axis=0)
+    x_max, y_max = np.max([level.max(axis=(0, 1)) for level in levels if len(level)], axis=0)
+    margin = padding * max(x_max - x_min, y_max - y_min)
+    x_min, x_max, y_min, y_max = x_min - margin, x_max + margin, y_min - margin, y_max + margin
+    scale = max((x_max - x_min) / length, (y_max - y_min) / width)
+    x_center, y_center = (x_min + x_max) / 2, (y_min + y_max) / 2
+    return ((x_center - scale * length / 2, x_center + scale * length / 2),
+            (y_center - scale * width / 2, y_center + scale * width / 2))
+
+
+def depth_colors(ndepths: int, colormap: str | Colormap = 'viridis') -> npt.NDArray[np.float64]:
+    """
+    Returns the colors of the levels of a tree, spread evenly over the colormap from the root to the deepest level.
+    :param ndepths: The number of levels.
+    :param colormap: The name of a matplotlib colormap, or a function mapping values between 0 and 1 onto RGB or RGBA
+                     colors between 0 and 1 (default: 'viridis').
+    :return: The RGB colors between 0 and 1, of shape (ndepths, 3).
+    """
+    if isinstance(colormap, str):
+        from matplotlib import colormaps  # Only needed for named colormaps, and slow to import
+        colormap = colormaps[colormap]
+    return np.asarray(colormap(np.linspace(0, 1, max(ndepths, 2))[:ndepths]), dtype=np.float64)[:, :3]
+
+
+def _rasterize_level(pixels: npt.NDArray[np.uint8],
+                     squares: npt.NDArray[np.float64],
+                     color: npt.NDArray[np.uint8]) -> None:
+    """
+    Fills the pixels whose centers lie in any of the given squares, given in pixel coordinates, and the pixel holding
+    the center of every square, so squares smaller than a pixel still show. Squares are grouped by the size of their
+    bounding boxes, and the pixel centers in the bounding boxes of a group are tested in one batch, so the work is
+    proportional to the area covered plus the number of squares.
+    """
+    width, length = pixels.shape[:2]
+    origins = squares[:, 0]
+    edges, normals = squares[:, 1] - origins, squares[:, 3] - origins
+    determinants = edges[:, 0] * normals[:, 1] - edges[:, 1] * normals[:, 0]
+
+    centers = np.floor((squares[:, 0] + squares[:, 2]) / 2).astype(np.intp)
+    visible = (centers[:, 0] >= 0) & (centers[:, 0] < length) & (centers[:, 1] >= 0) & (centers[:, 1] < width)
+    pixels[centers[visible, 1], centers[visible, 0]] = color
+
+    # Reducing over the four vertices one by one is much faster than reducing over an axis of length 4.
+    lower = np.floor(np.minimum(np.minimum(squares[:, 0], squares[:, 1]),
+                                np.minimum(squares[:, 2], squares[:, 3]))).astype(np.intp)
+    upper = np.ceil(np.maximum(np.maximum(squares[:, 0], squares[:, 1]),
+                               np.maximum(squares[:, 2], squares[:, 3]))).astype(np.intp)
+    # Squares are rasterized in groups whose bounding boxes span at most 2 ** k pixels in each direction. Squares within
+    # a single pixel are already drawn by their center.
+    classes = np.ceil(np.log2(np.maximum(np.maximum(upper[:, 0] - lower[:, 0], upper[:, 1] - lower[:, 1]), 1)))
+    classes = classes.astype(np.intp)
+    for size_class in np.unique(classes[classes > 0]):
+        span = 2 ** int(size_class)
+        members = np.flatnonzero(classes == size_class)
+        offsets = np.arange(span) + 0.5
+        chunk = max(1, _MAX_PIXELS // span ** 2)
+        for start in range(0, len(members), chunk):
+            group = members[start:start + chunk]
+            # The centers of the pixels in the bounding box of every square, relative to its first vertex.
+            x = lower[group, 0, np.newaxis, np.newaxis] + offsets[np.newaxis, np.newaxis, :]
+            y = lower[group, 1, np.newaxis, np.newaxis] + offsets[np.newaxis, :, np.newaxis]
+            dx, dy = x - origins[group, 0, np.newaxis, np.newaxis], y - origins[group, 1, np.newaxis, np.newaxis]
+            # The coordinates of the pixel centers along the edges of the square, which lie in [0, 1) inside it.
+            along = (dx * normals[group, 1, np.newaxis, np.newaxis]
+                     - dy * normals[group, 0, np.newaxis, np.newaxis]) / determinants[group, np.newaxis, np.newaxis]
+            across = (dy * edges[group, 0, np.newaxis, np.newaxis]
+                      - dx * edges[group, 1, np.newaxis, np.newaxis]) / determinants[group, np.newaxis, np.newaxis]
+            inside = (along >= 0) & (along < 1) & (across >= 0) & (across < 1)
+            inside &= (x >= 0) & (x < length) & (y >= 0) & (y < width)
+            # The square of the group every filled pixel lies in, and the pixel within the bounding box of the square.
+            owners, rows, columns = np.nonzero(inside)
+            corners = lower[group][owners]
+            pixels[corners[:, 1] + rows, corners[:, 0] + columns] = color
+
+
+def rasterize_tree(levels: Sequence[npt.NDArray[np.float64]],
+                   length: int = 1600,
+                   width: int = 1200,
+                   bounds: tuple[tuple[float, float], tuple[float, float]] | None = None,
+                   colormap: str | Colormap = 'viridis',
+                   background: tuple[int, int, int] = (255, 255, 255)) -> 'Image.Image':
+    """
+    Rasterizes the squares of a tree directly into an RGB image, level after level, so deeper squares are drawn on top.
+    A pixel is filled if its center lies in a square; squares smaller than a pixel fill the pixel holding their center.
+    :param levels: The levels of the tree, each an array of shape (N, 4, 2), such as the levels from tree_levels.
+    :param length: Length of the image, in pixels (default: 1600).
+    :param width: Width of the image, in pixels (default: 1200).
+    :param bounds: The x and y bounds of the image. If not given, the bounds of the tree are used (see tree_bounds).
+    :param colormap: The colormap the depths of the squares are colored with (see depth_colors, default: 'viridis').
+    :param background: The RGB color of the background (default: white).
+    :return: The image.
+    """
+    from PIL import Image  # Slow to import, and only needed once an image is made
+
+    (x_min, x_max), (y_min, y_max) = bounds if bounds is not None else tree_bounds(levels, length, width)
+    # Pixel coordinates have row 0 at the top of the image.
+    scale = np.array([length / (x_max - x_min), -width / (y_max - y_min)])
+    offset = np.array([x_min, y_max])
+    colors = np.round(255 * depth_colors(len(levels), colormap)).astype(np.uint8)
+    pixels = np.empty(shape=(width, length, 3), dtype=np.uint8)
+    pixels[...] = background
+    for level, color in zip(levels, colors):
+        if len(level):
+            _rasterize_level(pixels, (level - offset) * scale, color)
+    return Image.fromarray(pixels)
+
+
+def tree_collection(levels: Sequence[npt.NDArray[np.float64]],
+                    colormap: str | Colormap = 'viridis',
+                    **kwargs) -> 'PolyCollection':
+    """
+    Returns all squares of a tree as a single matplotlib PolyCollection, with each square colored by its depth, which
+    draws far faster than a patch per square.
+    :param levels: The levels of the tree, each an array of shape (N, 4, 2), such as the levels from tree_levels.
+    :param colormap: The colormap the depths of the squares are colored with (see depth_colors, default: 'viridis').
+    :param kwargs: Further keyword arguments to PolyCollection, such as edgecolors or linewidths.
+    :return: The collection.
+    """
+    from matplotlib.collections import PolyCollection  # Slow to import, and only needed for matplotlib output
+
+    colors = depth_colors(len(levels), colormap)
+    facecolors = np.repeat(colors, [len(level) for level in levels], axis=0)
+    kwargs.setdefault('linewidths', 0)
+    return PolyCollection(np.concatenate(levels), facecolors=facecolors, **kwargs)
+
+
+def tree_figure(levels: Sequence[npt.NDArray[np.float64]],
+                length: int = 1600,
+                width: int = 1200,
+                dpi: int = 100,
+                bounds: tuple[tuple[float, float], tuple[float, float]] | None = None,
+                colormap: str | Colormap = 'viridis',
+                background: str = 'white') -> 'Figure':
+    """
+    Returns a matplotlib figure showing the tree as a single PolyCollection, without axes. The figure is not attached to
+    pyplot, so it never opens a window and can be saved with Figure.savefig in any format matplotlib supports.
+    :param levels: The levels of the tree, each an array of shape (N, 4, 2), such as the levels from tree_levels.
+    :param length: Length of the figure, in pixels at the given dpi (default: 1600).
+    :param width: Width of the figure, in pixels at the given dpi (default: 1200).
+    :param dpi: The resolution of the figure (default: 100).
+    :param bounds: The x and y bounds of the figure. If not given, the bounds of the tree are used (see tree_bounds).
+    :param colormap: The colormap the depths of the squares are colored with (see depth_colors, default: 'viridis').
+    :param background: The color of the background (default: 'white').
+    :return: The figure.
+    """
+    from matplotlib.figure import Figure  # Slow to import, and only needed for matplotlib output
+
+    x_bounds, y_bounds = bounds if bounds is not None else tree_bounds(levels, length, width)
+    figure = Figure(figsize=(length / dpi, width / dpi), dpi=dpi, facecolor=background)
+    axes = figure.add_axes((0, 0, 1, 1))
+    axes.set_axis_off()
+    axes.add_collection(tree_collection(levels, colormap))
+    axes.set_xlim(*x_bounds)
+    axes.set_ylim(*y_bounds)
+    return figure
+
+
+def save_tree(path: str | os.PathLike,
+              alpha: float = 30,
+              min_leg: float = MIN_LEG,
+              max_depth: int | None = None,
+              length: int = 1600,
+              width: int = 1200,
+              method: Literal['raster'] | Literal['collection'] | None = None,
+              colormap: str | Colormap = 'viridis') -> None:
+    """
+    Generates a Pythagoras tree and saves a picture of it, without opening a window.
+    :param path: The file to save the picture to. Its suffix gives the format, such as .png or .svg.
+    :param alpha: The angle at the base of the triangle between a square and its two children, in degrees (default: 30).
+    :param min_leg: Squares whose width or height is at most this are not branched any further (default: MIN_LEG).
+    :param max_depth: If given, the number of levels after the root at which the tree stops.
+    :param length: Length of the picture, in pixels (default: 1600).
+    :param width: Width of the picture, in pixels (default: 1200).
+    :param method: 'raster' to rasterize the tree directly (see rasterize_tree), or 'collection' to draw it with
+                   matplotlib (see tree_figure). If not given, vector formats such as SVG and PDF are drawn with
+                   matplotlib and all other formats are rasterized.
+    :param colormap: The colormap the depths of the squares are colored with (see depth_colors, default: 'viridis').
+    """
+    levels = list(tree_levels(alpha, min_leg, max_depth))
+    if method is None:
+        method = 'collection' if Path(path).suffix.lower() in ('.svg', '.svgz', '.pdf', '.eps', '.ps') else 'raster'
+    match method:
+        case 'raster':
+            rasterize_tree(levels, length, width, colormap=colormap).save(path)
+        case 'collection':
+            tree_figure(levels, length, width, colormap=colormap).savefig(path)
+        case _:
+            raise ValueError(f'Unknown rendering method: {method!r}')
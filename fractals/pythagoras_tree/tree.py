@@ -0,0 +1,100 @@
+"""
+The squares of a Pythagoras tree, generated level by level as arrays of vertices.
+
+Every square of the tree carries two smaller squares on the legs of a right triangle erected on its top side. In
+coordinates, the children of every square are the images of the square under two fixed affine maps, so a whole level of
+the tree is expanded into the next with two batched transforms. Each level is held as an array of shape (N, 4, 2): the
+four vertices of each of its N squares, in the order of the corners (0, 0), (1, 0), (1, 1), (0, 1) of the unit square.
+"""
+
+
+from collections.abc import Generator
+
+import numpy as np
+import numpy.typing as npt
+
+
+__all__ = ['MIN_LEG', 'UNIT_SQUARE', 'tree_transforms', 'tree_levels', 'tree_squares']
+
+
+# Squares whose width or height is at most this are not branched any further.
+MIN_LEG = 0.01
+
+# The root of the tree.
+UNIT_SQUARE = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float64)
+
+
+def tree_transforms(alpha: float = 30) -> npt.NDArray[np.float64]:
+    """
+    Returns the affine maps taking a square of the tree to its two children: the counter-clockwise child, scaled by
+    cos(alpha) and rotated by alpha, and the clockwise child, scaled by sin(alpha) and rotated by alpha - 90 degrees.
+    :param alpha: The angle at the base of the triangle between a square and its two children, in degrees (default: 30).
+    :return: The two maps as an array of shape (2, 2, 3), each holding its linear part followed by its offset.
+    """
+    alpha_rad = np.radians(alpha)
+    cos_alph = np.cos(alpha_rad)
+    sin_alph = np.sin(alpha_rad)
+    counter_clockwise_transform = [[cos_alph ** 2, -cos_alph * sin_alph, 0],
+                                   [cos_alph * sin_alph, cos_alph ** 2, 1]]
+    clock_wise_transform = [[sin_alph ** 2, cos_alph * sin_alph, cos_alph ** 2],
+                            [-cos_alph * sin_alph, sin_alph ** 2, 1 + cos_alph * sin_alph]]
+    return np.array([counter_clockwise_transform, clock_wise_transform])
+
+
+def _squares(origins: npt.NDArray[np.float64], edges: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Returns the vertices of the squares with the given first vertices and first edges, of shape (N, 4, 2)."""
+    normals = np.stack([-edges[:, 1], edges[:, 0]], axis=1)
+    squares = np.empty(shape=(len(origins), 4, 2), dtype=np.float64)
+    squares[:, 0] = origins
+    np.add(origins, edges, out=squares[:, 1])
+    np.add(squares[:, 1], normals, out=squares[:, 2])
+    np.add(origins, normals, out=squares[:, 3])
+    return squares
+
+
+def tree_levels(alpha: float = 30,
+                min_leg: float = MIN_LEG,
+                max_depth: int | None = None) -> Generator[npt.NDArray[np.float64], None, None]:
+    """
+    Generates the squares of a Pythagoras tree level by level, starting from the unit square. The children of all
+    squares of a level are found with two batched affine transforms, and a child is only kept if the width and height of
+    its bounding box are both greater than min_leg, so branches stop growing once their squares are that small.
+
+    Both maps scale and rotate, so every child is a square again, and a square is held by its first vertex and its first
+    edge while the tree is expanded; the width and height of its bounding box are both |u_x| + |u_y| for its edge u. The
+    four vertices of the squares are only filled in for the levels which are yielded.
+
+    :param alpha: The angle at the base of the triangle between a square and its two children, in degrees (default: 30).
+    :param min_leg: Children whose width or height is at most this are dropped (default: MIN_LEG).
+    :param max_depth: If given, the number of levels after the root at which the tree stops, however large its squares.
+    :return: A generator of the levels of the tree, each an array of shape (N, 4, 2) of the vertices of its squares. The
+             level at index d holds the squares d steps away from the root.
+    """
+    if min_leg <= 0 and max_depth is None:
+        raise ValueError(f'The tree only ends if min_leg is positive or a maximum depth is given, got {min_leg}')
+    transforms = tree_transforms(alpha)
+    origins, edges = UNIT_SQUARE[np.newaxis, 0], UNIT_SQUARE[np.newaxis, 1] - UNIT_SQUARE[np.newaxis, 0]
+    depth = 0
+    while len(origins):
+        yield _squares(origins, edges)
+        if max_depth is not None and depth >= max_depth:
+            return
+        # The children of square n under both maps are at rows 2 n and 2 n + 1.
+        child_origins = np.empty(shape=(len(origins), 2, 2), dtype=np.float64)
+        child_edges = np.empty(shape=(len(origins), 2, 2), dtype=np.float64)
+        for index, ((a, b, e), (c, d, f)) in enumerate(transforms):
+            child_origins[:, index, 0] = a * origins[:, 0] + b * origins[:, 1] + e
+            child_origins[:, index, 1] = c * origins[:, 0] + d * origins[:, 1] + f
+            child_edges[:, index, 0] = a * edges[:, 0] + b * edges[:, 1]
+            child_edges[:, index, 1] = c * edges[:, 0] + d * edges[:, 1]
+        child_origins, child_edges = child_origins.reshape(-1, 2), child_edges.reshape(-1, 2)
+        kept = np.abs(child_edges[:, 0]) + np.abs(child_edges[:, 1]) > min_leg
+        origins, edges = child_origins[kept], child_edges[kept]
+        depth += 1
+
+
+def tree_squares(alpha: float = 30, min_leg: float = MIN_LEG, max_depth: int | None = None) -> npt.NDArray[np.float64]:
+    """
+    Returns all squares of a Pythagoras tree (see tree_levels) as one array of shape (N, 4, 2), level after level.
+    """
+    return np.concatenate(list(tree_levels(alpha, min_leg, max_depth)))
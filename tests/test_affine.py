@@ -0,0 +1,35 @@
+"""Tests of the affine iterated function systems of fractals.ifs.affine."""
+
+
+import math
+
+import numpy as np
+import pytest
+
+from fractals.ifs import cookbook
+from fractals.ifs.affine import AffineIFS
+from fractals.ifs.de_rham import cesaro_curve_ifs, koch_peano_curve_ifs
+
+
+@pytest.mark.parametrize('factory, parameter', [(koch_peano_curve_ifs, 0.5 + math.sqrt(3) / 6 * 1j),
+                                                (cesaro_curve_ifs, 0.5 + 0.5j)])
+def test_addresses_cover_dense_render(factory, parameter):
+    ifs = factory(parameter, random_state=0)
+    addresses = np.asarray(ifs.make_image(200, 150, method='addresses')) > 0
+    reference = np.asarray(ifs.make_image(200, 150, batch_size=10 ** 6, completeness_cutoff=0.9999)) > 0
+
+    # Every enumerated point lies on the attractor, so hardly any pixel may be filled that the reference misses.
+    assert np.count_nonzero(addresses & reference) >= 0.97 * np.count_nonzero(reference)
+    assert np.count_nonzero(addresses & ~reference) <= 0.001 * np.count_nonzero(reference)
+
+
+@pytest.mark.parametrize('name', ['koch_curve', 'levy_c_curve', 'vepstas_gallery23'])
+def test_single_precision_follows_double_precision(name):
+    maps = getattr(cookbook, name).maps
+    double, single = (next(AffineIFS(maps, random_state=0, precision=precision).generate_points(10 ** 5, retain=False))
+                      for precision in ('float64', 'float32'))
+
+    # The maps contract, so rounding errors stay within a few units in the last place of single precision instead of
+    # adding up over the steps.
+    assert single.dtype == np.float32
+    assert np.abs(single - double).max() <= 1e-6 * np.ptp(double, axis=0).max()
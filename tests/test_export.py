@@ -0,0 +1,30 @@
+"""Tests of writing line constructions to files in fractals.line_construction.export."""
+
+
+import numpy as np
+import pytest
+
+from fractals.line_construction.dragon_curve import dragon_chunks
+from fractals.line_construction.export import read_binary, save_curve, write_binary
+
+
+def _chunks():
+    return dragon_chunks(np.array([0.1, -0.3]), np.array([1 / 3, 0.7]), 9, chunk_size=100)
+
+
+@pytest.mark.parametrize('suffix', ['.bin', '.csv'])
+def test_curve_round_trips(tmp_path, suffix):
+    path = tmp_path / f'curve{suffix}'
+    expected = np.concatenate(list(_chunks()))
+
+    assert save_curve(path, _chunks()) == len(expected)
+    points = read_binary(path) if suffix == '.bin' else np.loadtxt(path, delimiter=',', skiprows=1)
+    np.testing.assert_array_equal(points, expected)
+
+
+def test_binary_round_trips_single_precision(tmp_path):
+    path = tmp_path / 'curve.f32'
+    expected = np.concatenate(list(_chunks())).astype('<f4')
+
+    write_binary(path, _chunks(), dtype='<f4')
+    np.testing.assert_array_equal(read_binary(path, dtype='<f4'), expected)
@@ -0,0 +1,14 @@
+"""Tests of the cached gallery renderer of fractals.ifs.gallery."""
+
+
+import pytest
+
+from fractals.ifs import cookbook
+from fractals.ifs.gallery import cache_key
+
+
+@pytest.mark.parametrize('setting, value', [('walkers', 64), ('precision', 'float32')])
+def test_cache_key_depends_on_settings(monkeypatch, setting, value):
+    key = cache_key(cookbook.koch_curve, 640, 480, 0, 'png', {})
+    monkeypatch.setattr(cookbook.koch_curve, setting, value)
+    assert cache_key(cookbook.koch_curve, 640, 480, 0, 'png', {}) != key
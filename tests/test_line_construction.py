@@ -0,0 +1,40 @@
+"""Tests of the curves built by subdividing and unfolding segments in fractals.line_construction."""
+
+
+import math
+
+import numpy as np
+import pytest
+
+from fractals.line_construction.dragon_curve import dragon, dragon_chunks, unfold_dragon
+from fractals.line_construction.koch import koch
+from fractals.line_construction.levy_c import levyc
+
+
+# The vertices the original recursive implementations produced, with the y coordinates of the Koch curve in units of
+# the height sqrt(3) / 2 of its smallest triangles.
+_KOCH = [(0, 0), (1, 0), (1.5, 1), (2, 0), (3, 0), (3.5, 1), (3, 2), (4, 2), (4.5, 3), (5, 2), (6, 2), (5.5, 1),
+         (6, 0), (7, 0), (7.5, 1), (8, 0), (9, 0)]
+_LEVY_C = [(0, 0), (-1, -1), (0, -2), (1, -3), (2, -2), (3, -3), (4, -2), (5, -1), (4, 0)]
+
+
+def test_koch_matches_recursive_construction():
+    points = koch(np.array([0, 0]), np.array([9, 0]), 2)
+    np.testing.assert_allclose(points, np.array(_KOCH) * [1, math.sqrt(3) / 2], atol=1e-12)
+
+
+def test_levyc_matches_recursive_construction():
+    points = levyc(np.array([0, 0]), np.array([4, 0]), 3)
+    np.testing.assert_allclose(points, _LEVY_C, atol=1e-12)
+
+
+def test_dragon_matches_recursive_construction():
+    points = dragon(np.array([0, 0]), np.array([9, 0]), 2)
+    np.testing.assert_allclose(points, np.array(_KOCH) * [1, math.sqrt(3) / 2], atol=1e-12)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 2 ** 10, 2 ** 16])
+def test_dragon_chunks_match_unfold_dragon(chunk_size):
+    start, end = np.array([0.5, -1]), np.array([2, 0.25])
+    chunks = list(dragon_chunks(start, end, 10, chunk_size=chunk_size))
+    np.testing.assert_allclose(np.concatenate(chunks), unfold_dragon(start, end, 10), atol=1e-9)
@@ -0,0 +1,24 @@
+"""Tests of rendering with a pool of processes in fractals.ifs.parallel."""
+
+
+import math
+
+import numpy as np
+
+from fractals.ifs.de_rham import koch_peano_curve_ifs
+
+
+def test_same_seed_and_processes_give_same_image():
+    images = [np.asarray(koch_peano_curve_ifs(0.5 + math.sqrt(3) / 6 * 1j, random_state=0)
+                         .make_image(200, 150, processes=2, batch_size=1000))
+              for _ in range(2)]
+
+    assert np.count_nonzero(images[0]) > 0
+    assert np.array_equal(images[0], images[1])
+
+
+def test_density_counts_every_point_once():
+    ifs = koch_peano_curve_ifs(0.5 + math.sqrt(3) / 6 * 1j, random_state=0)
+    buffer = ifs.accumulate_density(200, 150, npoints=10 ** 5 + 1, processes=3)
+
+    assert buffer.counts.sum() == 10 ** 5 + 1
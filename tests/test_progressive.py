@@ -0,0 +1,32 @@
+"""Tests of saving and resuming progressive renders with fractals.ifs.progressive."""
+
+
+import math
+
+import numpy as np
+import pytest
+
+from fractals.ifs.de_rham import koch_peano_curve_ifs
+
+
+def _ifs():
+    return koch_peano_curve_ifs(0.5 + math.sqrt(3) / 6 * 1j, random_state=0)
+
+
+@pytest.mark.parametrize('density', [False, True])
+def test_resumed_render_matches_uninterrupted_render(tmp_path, density):
+    options = dict(length=120, width=90, every=2, batch_size=1000, npoints=20000, density=density)
+    *_, expected = _ifs().render_progressive(**options)
+
+    checkpoint = tmp_path / 'render.npz'
+    states = _ifs().render_progressive(checkpoint=checkpoint, **options)
+    next(states)
+    states.close()
+    # The same state object is yielded again and again, updated in place.
+    counts = []
+    for resumed in _ifs().render_progressive(checkpoint=checkpoint, **options):
+        counts.append(resumed.npoints)
+
+    assert counts[0] == 4000
+    assert resumed.npoints == expected.npoints == 20000
+    np.testing.assert_array_equal(resumed.canvas.data, expected.canvas.data)